@@ -147,6 +147,19 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# Gamification
+GAMIFICATION_CONFIG_POLL_SECONDS = int(os.environ.get('GAMIFICATION_CONFIG_POLL_SECONDS', 30))
+LEADERBOARD_SYNC_SECONDS = float(os.environ.get('LEADERBOARD_SYNC_SECONDS', 1))  # Replay new ledger rows
+LEADERBOARD_REBUILD_SECONDS = int(os.environ.get('LEADERBOARD_REBUILD_SECONDS', 600))  # Full rank rebuild
+CHALLENGE_CACHE_SECONDS = int(os.environ.get('CHALLENGE_CACHE_SECONDS', 30))  # Per-team challenge id cache
+ACTIVITY_ARCHIVE_DIR = os.environ.get('ACTIVITY_ARCHIVE_DIR', BASE_DIR / 'archives' / 'activity')
+
+# Webhook delivery
+WEBHOOK_MAX_WORKERS = int(os.environ.get('WEBHOOK_MAX_WORKERS', 16))
+WEBHOOK_PER_HOST_CONCURRENCY = int(os.environ.get('WEBHOOK_PER_HOST_CONCURRENCY', 4))
+WEBHOOK_RATE_PER_SECOND = float(os.environ.get('WEBHOOK_RATE_PER_SECOND', 2.5))  # Per webhook URL
+WEBHOOK_RATE_BURST = int(os.environ.get('WEBHOOK_RATE_BURST', 5))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.environ.get('ACCESS_TOKEN_LIFETIME_MINUTES', 300))),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.environ.get('REFRESH_TOKEN_LIFETIME_DAYS', 30))),
@@ -1,8 +1,10 @@
 from django.contrib import admin
+from django.db.models import Sum
 from .models import (
     Category, Team, TeamMembership, Achievement, UserAchievement,
-    TeamChallenge, GamificationConfig, WebhookConfig, ActivityLog
+    TeamChallenge, GamificationConfig, PointsTransaction, DailyPointsRollup, WebhookConfig, WebhookOutbox, WebhookDeadLetter, ActivityLog
 )
+from .services import WebhookOutboxService
 
 
 @admin.register(Category)
@@ -67,11 +69,29 @@ class TeamChallengeAdmin(admin.ModelAdmin):
     search_fields = ['name', 'team__name']
     readonly_fields = ['current_progress']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(shard_progress=Sum('shards__amount'))
+    
     def progress_display(self, obj):
-        return f"{obj.current_progress}/{obj.target_value} ({obj.progress_percentage():.1f}%)"
+        return f"{obj.get_total_progress()}/{obj.target_value} ({obj.progress_percentage():.1f}%)"
     progress_display.short_description = 'Progress'
 
 
+@admin.register(PointsTransaction)
+class PointsTransactionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'amount', 'balance_after', 'reason', 'created_at']
+    list_filter = ['reason', 'created_at']
+    search_fields = ['user__username', 'reason']
+    readonly_fields = ['user', 'amount', 'balance_after', 'reason', 'created_at']
+
+
+@admin.register(DailyPointsRollup)
+class DailyPointsRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'day', 'period', 'category', 'points', 'tasks_completed']
+    list_filter = ['period', 'category', 'day']
+    search_fields = ['user__username']
+
+
 @admin.register(GamificationConfig)
 class GamificationConfigAdmin(admin.ModelAdmin):
     list_display = ['name', 'is_active', 'updated_at']
@@ -91,7 +111,8 @@ class WebhookConfigAdmin(admin.ModelAdmin):
         }),
         ('Notification Settings', {
             'fields': ('notify_task_completion', 'notify_achievements', 
-                      'notify_team_challenges', 'notify_milestones')
+                      'notify_team_challenges', 'notify_milestones',
+                      'digest_window_seconds')
         }),
         ('Status', {
             'fields': ('is_active',)
@@ -99,6 +120,28 @@ class WebhookConfigAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(WebhookOutbox)
+class WebhookOutboxAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'webhook', 'status', 'attempts', 'available_at', 'delivered_at', 'created_at']
+    list_filter = ['status', 'event_type', 'webhook__platform']
+    search_fields = ['webhook__name', 'event_type']
+    readonly_fields = ['created_at', 'locked_at', 'delivered_at']
+
+
+@admin.register(WebhookDeadLetter)
+class WebhookDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'webhook', 'status_code', 'attempts', 'failed_at', 'replayed_at']
+    list_filter = ['event_type', 'status_code', 'webhook__platform', 'failed_at']
+    search_fields = ['webhook__name', 'event_type', 'last_error']
+    readonly_fields = ['failed_at', 'replayed_at']
+    actions = ['replay']
+    
+    @admin.action(description='Replay selected payloads')
+    def replay(self, request, queryset):
+        replayed = WebhookOutboxService.replay_dead_letters(queryset)
+        self.message_user(request, f'Queued {replayed} payloads for delivery.')
+
+
 @admin.register(ActivityLog)
 class ActivityLogAdmin(admin.ModelAdmin):
     list_display = ['user', 'action_type', 'points_earned', 'timestamp']
@@ -0,0 +1,250 @@
+import threading
+import time
+from array import array
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_left, bisect_right, insort
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q, Sum
+
+from users.models import User
+from .models import DailyPointsRollup, PointsTransaction
+
+
+def encode_cursor(*values):
+    """Opaque cursor holding the keyset position of the last row on a page"""
+    return urlsafe_b64encode(':'.join(str(value) for value in values).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """Integers stored by encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        values = [int(value) for value in urlsafe_b64decode(cursor.encode()).decode().split(':')]
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def after_position(points, pk, field='points'):
+    """Rows after (points, pk) in (-points, id) order
+
+    Written as a range on the leading column plus a tie-breaker so the
+    database seeks straight to the position instead of scanning the rows
+    before it.
+    """
+    return Q(**{f'{field}__lte': points}) & (Q(**{f'{field}__lt': points}) | Q(pk__gt=pk))
+
+
+def before_position(points, pk, field='points'):
+    """Rows before (points, pk) in (-points, id) order"""
+    return Q(**{f'{field}__gte': points}) & (Q(**{f'{field}__gt': points}) | Q(pk__lt=pk))
+
+
+class PointsHistogram:
+    """Fenwick tree counting users per points value
+
+    Answers "how many users have more than X points" in O(log n). The
+    capacity is a power of two and doubles when a larger value shows up, up
+    to MAX_CAPACITY; the few values beyond that are kept in a sorted list
+    instead, so one outlier balance can't blow the tree up.
+    """
+
+    MAX_CAPACITY = 1 << 20
+
+    def __init__(self, capacity=1024, max_capacity=MAX_CAPACITY):
+        self.max_capacity = 1
+        while self.max_capacity < max_capacity:
+            self.max_capacity *= 2
+        self.capacity = 1
+        while self.capacity < min(capacity, self.max_capacity):
+            self.capacity *= 2
+        self.tree = array('q', bytes(8 * (self.capacity + 1)))
+        self.outliers = []  # Sorted values of at least max_capacity, one entry per user
+        self.total = 0
+
+    def _grow(self, value):
+        while value >= self.capacity:
+            # Nodes of the new upper half are empty except the root, which spans everything
+            self.tree.extend(array('q', bytes(8 * self.capacity)))
+            self.capacity *= 2
+            self.tree[self.capacity] = self.tree[self.capacity // 2]
+
+    def add(self, value, count=1):
+        value = max(value, 0)
+        self.total += count
+        if value >= self.max_capacity:
+            for _ in range(count):
+                insort(self.outliers, value)
+            for _ in range(-count):
+                index = bisect_left(self.outliers, value)
+                if index < len(self.outliers) and self.outliers[index] == value:
+                    del self.outliers[index]
+            return
+        self._grow(value)
+        index = value + 1
+        while index <= self.capacity:
+            self.tree[index] += count
+            index += index & -index
+
+    def count_at_most(self, value):
+        if value < 0:
+            return 0
+        if value >= self.max_capacity:
+            return self.total - (len(self.outliers) - bisect_right(self.outliers, value))
+        index = min(value + 1, self.capacity)
+        result = 0
+        while index > 0:
+            result += self.tree[index]
+            index -= index & -index
+        return result
+
+    def count_greater(self, value):
+        return self.total - self.count_at_most(value)
+
+
+class LeaderboardIndex:
+    """Process-local order statistics over User.points
+
+    Built from one grouped query, then kept current by replaying new
+    PointsTransaction rows, which record each user's balance after every
+    change. Rows that commit out of id order are caught by tracking id gaps
+    for a while, and a periodic full rebuild picks up points written outside
+    the ledger (admin edits, recompute_gamification).
+    """
+
+    GAP_TIMEOUT_SECONDS = 60
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histogram = None
+        self.last_transaction_id = 0
+        self.gaps = {}  # Transaction id -> monotonic time it went missing
+        self.built_at = 0.0
+        self.synced_at = 0.0
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _rebuild(self):
+        outermost = not connection.in_atomic_block
+        with transaction.atomic():
+            if outermost:
+                # Read the ledger position and the histogram from one snapshot
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            last_id = PointsTransaction.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+            histogram = PointsHistogram()
+            for points, count in (
+                User.objects.filter(points__gt=0).order_by()
+                .values('points').annotate(count=Count('id')).values_list('points', 'count')
+            ):
+                histogram.add(points, count)
+
+        self.histogram = histogram
+        self.last_transaction_id = last_id
+        self.gaps = {}
+        self.built_at = self.synced_at = time.monotonic()
+
+    def _sync(self):
+        now = time.monotonic()
+        self.gaps = {
+            txn_id: missing_since for txn_id, missing_since in self.gaps.items()
+            if now - missing_since < self.GAP_TIMEOUT_SECONDS
+        }
+        queryset = PointsTransaction.objects.filter(id__gt=self.last_transaction_id)
+        if self.gaps:
+            queryset = queryset | PointsTransaction.objects.filter(id__in=list(self.gaps))
+
+        for txn_id, amount, balance in queryset.order_by('id').values_list('id', 'amount', 'balance_after'):
+            previous = balance - amount
+            if previous > 0:
+                self.histogram.add(previous, -1)
+            if balance > 0:
+                self.histogram.add(balance, 1)
+
+            if txn_id in self.gaps:
+                del self.gaps[txn_id]
+            elif txn_id > self.last_transaction_id:
+                for missing in range(self.last_transaction_id + 1, txn_id):
+                    self.gaps[missing] = now
+                self.last_transaction_id = txn_id
+
+        self.synced_at = now
+
+    def _refresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.histogram is None or now - self.built_at > settings.LEADERBOARD_REBUILD_SECONDS:
+                self._rebuild()
+            elif now - self.synced_at > settings.LEADERBOARD_SYNC_SECONDS:
+                self._sync()
+
+    def rank_for_points(self, points):
+        """Rank a user with this many points would have (ties share a rank)"""
+        self._refresh()
+        return self.histogram.count_greater(points) + 1
+
+    def rank_of(self, user):
+        return self.rank_for_points(user.points)
+
+    def _ranked(self, users):
+        for user in users:
+            user.rank = self.rank_for_points(user.points)
+        return users
+
+    def top(self, limit, after=None):
+        """Highest-ranked users, read through the (points, id) index
+
+        `after` is the (points, id) of the last user on the previous page.
+        """
+        users = User.objects.order_by('-points', 'id')
+        if after is not None:
+            users = users.filter(after_position(*after))
+        return self._ranked(list(users[:limit]))
+
+    def around(self, user, count):
+        """Up to `count` users directly above and below `user`, in board order"""
+        above = User.objects.filter(before_position(user.points, user.pk)).order_by('points', '-id')[:count]
+        below = User.objects.filter(after_position(user.points, user.pk)).order_by('-points', 'id')[:count]
+        return self._ranked(list(reversed(above)) + [user] + list(below))
+
+
+def rollup_leaderboard(start, end, category_id=None, limit=50):
+    """Users ranked by points earned between start and end (inclusive dates)
+
+    Sums DailyPointsRollup rows, so each user contributes at most one row per
+    day of the window. Months folded by compact_rollups count when their first
+    day falls inside the window.
+    """
+    rows = DailyPointsRollup.objects.filter(day__range=(start, end))
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    rows = rows.values('user_id', 'user__username', 'user__avatar').annotate(
+        total_points=Sum('points'),
+        total_tasks=Sum('tasks_completed')
+    ).filter(Q(total_points__gt=0) | Q(total_tasks__gt=0)).order_by('-total_points', '-total_tasks', 'user_id')
+
+    leaderboard = []
+    for position, row in enumerate(rows[:limit], 1):
+        previous = leaderboard[-1] if leaderboard else None
+        tied = previous and previous['points'] == row['total_points']
+        leaderboard.append({
+            'user_id': row['user_id'],
+            'username': row['user__username'],
+            'avatar': row['user__avatar'],
+            'points': row['total_points'],
+            'tasks_completed': row['total_tasks'],
+            'rank': previous['rank'] if tied else position
+        })
+    return leaderboard
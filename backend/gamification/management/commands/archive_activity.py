@@ -0,0 +1,119 @@
+import gzip
+import json
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import F, Max, Min
+from django.utils import timezone
+from gamification.models import ActivityLog, DashboardSnapshot
+from gamification.partitions import add_months, existing_partitions, partition_name
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'action_type', 'points_earned',
+    'task_id', 'project_id', 'team_id', 'achievement_id', 'metadata', 'timestamp',
+]
+UNITS = {'d': 1, 'w': 7}
+
+
+def parse_age(value):
+    """Days in an age such as 180d, 26w or 180"""
+    match = re.fullmatch(r'(\d+)([dw]?)', value.strip())
+    if not match:
+        raise CommandError(f'Invalid age "{value}"; use a number of days like 180d or weeks like 26w')
+    return int(match.group(1)) * UNITS.get(match.group(2) or 'd')
+
+
+class Command(BaseCommand):
+    help = 'Move old activity logs into gzip-compressed JSONL files, one per month, and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', default='180d',
+                            help='Archive rows older than this age (e.g. 180d, 26w)')
+        parser.add_argument('--output-dir', default=None,
+                            help='Directory for archive files (default: ACTIVITY_ARCHIVE_DIR)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched per database round trip while streaming')
+        parser.add_argument('--delete-batch-size', type=int, default=5000,
+                            help='Rows deleted per statement after archiving')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(days=parse_age(options['older_than']))
+        old_rows = ActivityLog.objects.filter(timestamp__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{old_rows.count()} activity rows before {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        output_dir = Path(options['output_dir'] or settings.ACTIVITY_ARCHIVE_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        first = old_rows.aggregate(first=Min('timestamp'))['first']
+        if first is None:
+            self.stdout.write('No activity to archive')
+            return
+
+        # Daily rollups are a separate table, so leaderboard totals are unaffected
+        archived = deleted = 0
+        month = timezone.localtime(first).date().replace(day=1)
+        while month < cutoff.date():
+            start = timezone.make_aware(timezone.datetime(month.year, month.month, 1))
+            next_month = add_months(month, 1)
+            end = min(cutoff, timezone.make_aware(timezone.datetime(next_month.year, next_month.month, 1)))
+            month_rows = ActivityLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+
+            # Rows written after this point are left for the next run
+            last_id = month_rows.aggregate(last_id=Max('id'))['last_id']
+            if last_id is not None:
+                path = output_dir / f'activity-{month:%Y-%m}.jsonl.gz'
+                count = 0
+                with gzip.open(path, 'at', encoding='utf-8') as archive:
+                    for row in month_rows.filter(id__lte=last_id).order_by().values(*ARCHIVE_FIELDS).iterator(
+                        chunk_size=options['chunk_size']
+                    ):
+                        # Full-precision timestamps keep (id, timestamp) identical on restore
+                        row['timestamp'] = row['timestamp'].isoformat()
+                        archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                        count += 1
+                archived += count
+
+                month_deleted = self.delete_in_batches(
+                    month_rows.filter(id__lte=last_id), options['delete_batch_size']
+                )
+                deleted += month_deleted
+                self.stdout.write(f'Archived {count} rows to {path}, deleted {month_deleted}')
+
+            if end < cutoff:
+                self.drop_empty_partition(month)
+            month = next_month
+
+        # Dashboards may list archived rows as recent activity
+        DashboardSnapshot.objects.update(version=F('version') + 1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} activity rows older than {cutoff:%Y-%m-%d}, deleted {deleted}'
+        ))
+
+    def delete_in_batches(self, queryset, batch_size):
+        """Delete in bounded statements so no single transaction holds locks for long"""
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.filter(id__in=ids).delete()[0]
+
+    def drop_empty_partition(self, month):
+        """Drop a fully archived month's partition; restored rows fall back to the default partition"""
+        name = partition_name(month)
+        if name not in existing_partitions():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {name})')
+            if not cursor.fetchone()[0]:
+                cursor.execute(f'DROP TABLE {name}')
+                self.stdout.write(f'Dropped empty partition {name}')
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from gamification.models import DailyPointsRollup
+
+
+class Command(BaseCommand):
+    help = 'Fold old daily leaderboard rollups into monthly rows and drop empty ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=120,
+                            help='Keep day-level rows at least this many days back')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be compacted')
+
+    def handle(self, *args, **options):
+        # Only whole months are folded, so windows inside retention stay day-accurate
+        cutoff = (timezone.localdate() - timezone.timedelta(days=options['keep_days'])).replace(day=1)
+        old_days = DailyPointsRollup.objects.filter(period='day', day__lt=cutoff)
+        empty = DailyPointsRollup.objects.filter(points=0, tasks_completed=0)
+
+        if options['dry_run']:
+            self.stdout.write(f'{old_days.count()} daily rows before {cutoff} would be folded, '
+                              f'{empty.count()} empty rows removed')
+            return
+
+        table = DailyPointsRollup._meta.db_table
+        folded = 0
+        month = old_days.aggregate(first=Min('day'))['first']
+        while month and month < cutoff:
+            month = month.replace(day=1)
+            next_month = (month + timezone.timedelta(days=32)).replace(day=1)
+            # One transaction per month keeps locks short and readers never see a month twice
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"""
+                        INSERT INTO {table} (user_id, day, period, category_id, points, tasks_completed)
+                        SELECT user_id, %s, 'month', category_id, SUM(points), SUM(tasks_completed)
+                        FROM {table}
+                        WHERE period = 'day' AND day >= %s AND day < %s
+                        GROUP BY user_id, category_id
+                        ON CONFLICT ON CONSTRAINT daily_rollup_unique DO UPDATE SET
+                            points = {table}.points + EXCLUDED.points,
+                            tasks_completed = {table}.tasks_completed + EXCLUDED.tasks_completed
+                        """,
+                        [month, month, next_month]
+                    )
+                folded += old_days.filter(day__gte=month, day__lt=next_month).delete()[0]
+            month = old_days.aggregate(first=Min('day'))['first']
+
+        removed = empty.delete()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Folded {folded} daily rows before {cutoff} into monthly rows, removed {removed} empty rows'
+        ))
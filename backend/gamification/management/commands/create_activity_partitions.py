@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from gamification.partitions import add_months, create_month_partition, existing_partitions, partition_name
+
+
+class Command(BaseCommand):
+    help = 'Create monthly ActivityLog partitions ahead of time (run monthly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of future months to create partitions for')
+
+    def handle(self, *args, **options):
+        existing = existing_partitions()
+        this_month = timezone.localdate().replace(day=1)
+
+        created = 0
+        for offset in range(options['months_ahead'] + 1):
+            month = add_months(this_month, offset)
+            if partition_name(month) in existing:
+                continue
+            moved = create_month_partition(month)
+            created += 1
+            self.stdout.write(f'Created {partition_name(month)}'
+                              + (f' and moved {moved} rows out of the default partition' if moved else ''))
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} partitions'))
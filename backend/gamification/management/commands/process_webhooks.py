@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from gamification.services import WebhookOutboxService
+from gamification.webhooks import WebhookDispatcher, WebhookSender
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued webhook notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of outbox rows claimed per round')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of parallel HTTP deliveries (default: WEBHOOK_MAX_WORKERS)')
+        parser.add_argument('--per-host', type=int, default=None,
+                            help='Concurrent requests per webhook host (default: WEBHOOK_PER_HOST_CONCURRENCY)')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--keep-days', type=int, default=7,
+                            help='Days to keep delivered rows before purging them')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox once and exit (for cron)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Processing webhook outbox...'))
+        dispatcher = WebhookDispatcher(sender=WebhookSender(
+            max_workers=options['workers'],
+            per_host_concurrency=options['per_host']
+        ))
+
+        try:
+            while True:
+                close_old_connections()
+                entries = WebhookOutboxService.claim_batch(options['batch_size'])
+
+                if not entries:
+                    purged = WebhookOutboxService.purge_delivered(options['keep_days'])
+                    if purged:
+                        self.stdout.write(f'Purged {purged} delivered rows')
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                delivered, failed = WebhookOutboxService.deliver_batch(entries, dispatcher)
+                self.stdout.write(f'Delivered {delivered}, failed {failed}')
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping webhook worker')
+
+        self.stdout.write(self.style.SUCCESS('Webhook outbox processing stopped'))
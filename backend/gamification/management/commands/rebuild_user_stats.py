@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from gamification.models import Team, TeamChallenge, TeamMembership, UserAchievement
+from projects.models import Project, Task
+from users.models import User
+
+
+def count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized task, project and achievement counters on users and the team totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Number of user ids updated per statement')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        completed = Task.objects.filter(status='completed')
+        counters = {
+            'tasks_completed': count_subquery(completed, 'assigned_to'),
+            'collaboration_completed': count_subquery(
+                completed.exclude(created_by=F('assigned_to')), 'assigned_to'
+            ),
+            'projects_created': count_subquery(Project.objects.all(), 'owner'),
+            'achievements_count': count_subquery(UserAchievement.objects.all(), 'user'),
+        }
+
+        max_id = User.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        updated = 0
+        for start in range(0, max_id + 1, chunk_size):
+            updated += User.objects.filter(
+                id__gte=start, id__lt=start + chunk_size
+            ).update(**counters)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} users'))
+
+        member_points = TeamMembership.objects.filter(
+            team=OuterRef('pk')
+        ).order_by().values('team').annotate(total=Sum('user__points')).values('total')
+        teams = Team.objects.update(
+            total_points=Coalesce(Subquery(member_points, output_field=IntegerField()), Value(0)),
+            member_count=count_subquery(TeamMembership.objects.all(), 'team'),
+            completed_challenges=count_subquery(TeamChallenge.objects.filter(status='completed'), 'team'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt totals for {teams} teams'))
@@ -0,0 +1,267 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+STAT_FIELDS = [
+    'points', 'current_streak', 'longest_streak', 'last_activity_date',
+    'tasks_completed', 'collaboration_completed', 'projects_created', 'achievements_count',
+]
+# Corrected by adding the difference, so live increments since the read are kept
+DELTA_FIELDS = ['points', 'tasks_completed', 'collaboration_completed', 'projects_created', 'achievements_count']
+# Corrected by compare-and-set on last_activity_date, like update_user_streak
+STREAK_FIELDS = ['current_streak', 'longest_streak', 'last_activity_date']
+
+
+def init_worker():
+    """Give each worker process its own database connections"""
+    django.setup()
+    connections.close_all()
+
+
+def compute_streaks(days, today):
+    """Current streak, longest streak and last active day from sorted activity dates"""
+    longest = run = 0
+    previous = None
+    for day in days:
+        run = run + 1 if previous and (day - previous).days == 1 else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous and (today - previous).days <= 1 else 0
+    return current, longest, previous
+
+
+def read_chunk(start_id, end_id):
+    """Stored stats, source aggregates and earned achievements for one id range"""
+    from gamification.models import DailyPointsRollup, PointsTransaction, UserAchievement
+    from projects.models import Project, Task
+    from users.models import User
+
+    id_range = {'gte': start_id, 'lt': end_id}
+    users = {
+        user.id: user
+        for user in User.objects.filter(id__gte=start_id, id__lt=end_id).only('id', 'username', *STAT_FIELDS)
+    }
+
+    def by_user(queryset, user_field, **aggregates):
+        rows = queryset.filter(
+            **{f'{user_field}__{lookup}': value for lookup, value in id_range.items()}
+        ).order_by().values(user_field).annotate(**aggregates)
+        return {row[user_field]: row for row in rows}
+
+    tasks = by_user(
+        Task.objects.filter(status='completed'), 'assigned_to',
+        total=Count('id'), collaboration=Count('id', filter=~Q(created_by=F('assigned_to')))
+    )
+    projects = by_user(Project.objects.all(), 'owner', total=Count('id'))
+    points = by_user(PointsTransaction.objects.all(), 'user', total=Sum('amount'))
+
+    # Daily rollups outlive archived activity logs, so streaks are rebuilt from
+    # them. compact_rollups folds old days into month rows, which only say that
+    # a month had activity, so streaks reaching into them can't be recounted.
+    active = DailyPointsRollup.objects.filter(
+        user_id__gte=start_id, user_id__lt=end_id
+    ).order_by().values('user_id', 'day', 'period').annotate(tasks=Sum('tasks_completed')).filter(tasks__gt=0)
+    activity_days, folded_months = {}, set()
+    for user_id, day, period in active.values_list('user_id', 'day', 'period').order_by('user_id', 'day'):
+        if period == 'day':
+            activity_days.setdefault(user_id, []).append(day)
+        else:
+            folded_months.add((user_id, day))
+
+    earned = {}
+    for user_id, achievement_id in UserAchievement.objects.filter(
+        user_id__gte=start_id, user_id__lt=end_id
+    ).values_list('user_id', 'achievement_id'):
+        earned.setdefault(user_id, set()).add(achievement_id)
+
+    return users, tasks, projects, points, activity_days, folded_months, earned
+
+
+def apply_corrections(corrections):
+    """Add counter deltas and compare-and-set streaks in one statement
+
+    `corrections` holds (user id, {field: delta}, streak values, last_activity_date
+    as read). Deltas land on top of whatever live updates committed since
+    the read; streaks are skipped for users whose streak moved meanwhile,
+    as update_user_streak does.
+    """
+    from users.models import User
+
+    # SET expressions all see the row as it was, so each CASE tests the old date
+    unchanged = 'account.last_activity_date IS NOT DISTINCT FROM fix.read_last_activity_date'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {User._meta.db_table} AS account SET
+                {', '.join(f'{field} = account.{field} + fix.{field}' for field in DELTA_FIELDS)},
+                current_streak = CASE WHEN {unchanged} THEN fix.current_streak ELSE account.current_streak END,
+                longest_streak = CASE WHEN {unchanged}
+                    THEN GREATEST(fix.longest_streak, account.longest_streak) ELSE account.longest_streak END,
+                last_activity_date = CASE WHEN {unchanged}
+                    THEN fix.last_activity_date ELSE account.last_activity_date END
+            FROM unnest(
+                %s::bigint[], {', '.join('%s::integer[]' for _ in DELTA_FIELDS)},
+                %s::integer[], %s::integer[], %s::date[], %s::date[]
+            ) AS fix(
+                id, {', '.join(DELTA_FIELDS)},
+                current_streak, longest_streak, last_activity_date, read_last_activity_date
+            )
+            WHERE account.id = fix.id
+            """,
+            [
+                [user_id for user_id, _, _, _ in corrections],
+                *[[deltas[field] for _, deltas, _, _ in corrections] for field in DELTA_FIELDS],
+                *[[streaks[field] for _, _, streaks, _ in corrections] for field in STREAK_FIELDS],
+                [read_last for _, _, _, read_last in corrections],
+            ]
+        )
+
+
+def recompute_chunk(start_id, end_id, dry_run=False):
+    """Recompute gamification state for users with start_id <= id < end_id
+
+    Returns (users processed, users changed, achievements created, diff lines).
+    """
+    from gamification.models import TeamMembership
+    from gamification.services import AchievementEngine, DashboardService, GamificationService
+
+    # Sources and stored stats come from one snapshot, so each correction is
+    # the exact difference at that moment and can be added as a delta
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        users, tasks, projects, points, activity_days, folded_months, earned = read_chunk(start_id, end_id)
+    if not users:
+        return 0, 0, 0, []
+
+    today = timezone.localdate()
+    corrections, to_award, diff = [], [], []
+    missing_achievements = 0
+    for user_id, user in users.items():
+        current_streak, longest_streak, last_day = compute_streaks(activity_days.get(user_id, []), today)
+        if current_streak and last_day == user.last_activity_date:
+            day_before_run = last_day - timezone.timedelta(days=current_streak)
+            if (user_id, day_before_run.replace(day=1)) in folded_months:
+                # The run may continue into compacted months; keep the stored count
+                current_streak = max(current_streak, user.current_streak)
+        # Runs older than the compaction window only survive in the stored value
+        longest_streak = max(longest_streak, current_streak, user.longest_streak)
+
+        values = {
+            'points': points.get(user_id, {}).get('total') or 0,
+            'tasks_completed': tasks.get(user_id, {}).get('total', 0),
+            'collaboration_completed': tasks.get(user_id, {}).get('collaboration', 0),
+            'projects_created': projects.get(user_id, {}).get('total', 0),
+            'achievements_count': len(earned.get(user_id, ())),
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'last_activity_date': last_day,
+        }
+        differences = [
+            (field, getattr(user, field), value)
+            for field, value in values.items() if getattr(user, field) != value
+        ]
+        if differences:
+            diff.extend(f'user {user_id} {field}: {old} -> {new}' for field, old, new in differences)
+            corrections.append((
+                user_id,
+                {field: values[field] - getattr(user, field) for field in DELTA_FIELDS},
+                {field: values[field] for field in STREAK_FIELDS},
+                user.last_activity_date
+            ))
+
+        # Achievements the counters qualify for but that were never recorded
+        metrics = {
+            'task_completion': values['tasks_completed'],
+            'collaboration': values['collaboration_completed'],
+            'leadership': values['projects_created'],
+            'streak': values['longest_streak'],
+        }
+        missing = [
+            achievement
+            for achievement_type, value in metrics.items()
+            for achievement in AchievementEngine.crossed(achievement_type, value)
+            if achievement.id not in earned.get(user_id, ())
+        ]
+        if missing:
+            missing_achievements += len(missing)
+            diff.extend(f'user {user_id} missing achievement: {achievement.name}' for achievement in missing)
+            to_award.append((user, metrics))
+
+    if dry_run:
+        return len(users), len(corrections), missing_achievements, diff
+
+    if corrections:
+        with transaction.atomic():
+            apply_corrections(corrections)
+            # Points that drifted from the ledger are reconciled without a ledger
+            # row; their teams are recounted so totals match members' points again
+            GamificationService.refresh_team_points(TeamMembership.objects.filter(
+                user_id__in=[user_id for user_id, deltas, _, _ in corrections if deltas['points']]
+            ).values('team_id'))
+        DashboardService.invalidate(*[user_id for user_id, _, _, _ in corrections])
+
+    # Awarding through the engine records ledger rows, rollups, team totals,
+    # activity and notifications exactly as a live unlock would
+    created = 0
+    for user, metrics in to_award:
+        created += len(AchievementEngine.award(user, metrics))
+
+    return len(users), len(corrections), created, []
+
+
+class Command(BaseCommand):
+    help = 'Recompute points, streaks, counters and achievements for every user from source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Number of user ids per work unit')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of worker processes')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Print the differences without writing them')
+
+    def handle(self, *args, **options):
+        from users.models import User
+
+        bounds = User.objects.aggregate(min_id=Min('id'), max_id=Max('id'))
+        if bounds['min_id'] is None:
+            self.stdout.write('No users to recompute')
+            return
+
+        chunk_size = options['chunk_size']
+        chunks = [
+            (start, start + chunk_size, options['dry_run'])
+            for start in range(bounds['min_id'], bounds['max_id'] + 1, chunk_size)
+        ]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputing {len(chunks)} chunks with {options["workers"]} workers...'
+        ))
+        started = time.monotonic()
+        processed = changed = created = 0
+
+        # Connections must not be shared with forked workers
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as executor:
+            futures = [executor.submit(recompute_chunk, *chunk) for chunk in chunks]
+            for future in futures:
+                chunk_processed, chunk_changed, chunk_created, diff = future.result()
+                processed += chunk_processed
+                changed += chunk_changed
+                created += chunk_created
+                for line in diff:
+                    self.stdout.write(line)
+
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else processed
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {changed} of {processed} users and {created} missing achievements '
+            f'in {elapsed:.1f}s ({rate:.0f} users/s)'
+        ))
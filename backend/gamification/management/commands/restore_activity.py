@@ -0,0 +1,94 @@
+import gzip
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from gamification.models import Achievement, ActivityLog, Team
+from gamification.services import DashboardService
+from projects.models import Project, Task
+from users.models import User
+
+RELATED = {'task_id': Task, 'project_id': Project, 'team_id': Team, 'achievement_id': Achievement}
+
+
+@contextmanager
+def preserved_timestamps():
+    """Let bulk_create write archived timestamps instead of auto_now_add's current time"""
+    field = ActivityLog._meta.get_field('timestamp')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Load activity logs back from a file written by archive_activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help='Path to an activity-YYYY-MM.jsonl.gz file')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows inserted per bulk_create')
+
+    def handle(self, *args, **options):
+        try:
+            archive = gzip.open(options['archive'], 'rt', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot open {options["archive"]}: {e}')
+
+        restored = already_present = skipped = 0
+        with archive, preserved_timestamps():
+            rows = (json.loads(line) for line in archive if line.strip())
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                logs = self.build_logs(batch)
+                skipped += len(batch) - len(logs)
+                if not logs:
+                    continue
+                # Rows restored by an earlier run conflict on (id, timestamp) and are
+                # dropped, so what was inserted is told by counting the batch's rows
+                present = ActivityLog.objects.filter(
+                    id__in=[log.id for log in logs],
+                    timestamp__range=(min(log.timestamp for log in logs), max(log.timestamp for log in logs))
+                )
+                before = present.count()
+                ActivityLog.objects.bulk_create(logs, ignore_conflicts=True)
+                inserted = present.count() - before
+                if inserted:
+                    DashboardService.mark_stale({log.user_id for log in logs})
+                restored += inserted
+                already_present += len(logs) - inserted
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {restored} activity rows, left {already_present} already present, '
+            f'skipped {skipped} for deleted users'
+        ))
+
+    def build_logs(self, batch):
+        """ActivityLog rows for a batch, dropping references to objects deleted since archiving"""
+        existing = {'user_id': set(User.objects.filter(
+            id__in={row['user_id'] for row in batch}
+        ).values_list('id', flat=True))}
+        for field, model in RELATED.items():
+            existing[field] = set(model.objects.filter(
+                id__in={row[field] for row in batch if row[field]}
+            ).values_list('id', flat=True))
+
+        logs = []
+        for row in batch:
+            if row['user_id'] not in existing['user_id']:
+                continue
+            logs.append(ActivityLog(
+                id=row['id'],
+                user_id=row['user_id'],
+                action_type=row['action_type'],
+                points_earned=row['points_earned'],
+                metadata=row['metadata'],
+                timestamp=parse_datetime(row['timestamp']),
+                **{field: row[field] if row[field] in existing[field] else None for field in RELATED}
+            ))
+        return logs
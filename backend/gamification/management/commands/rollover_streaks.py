@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Reset the current streak of every user who missed a day (run daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of users reset per UPDATE statement')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many streaks would be reset')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        broken = User.objects.filter(current_streak__gt=0).filter(
+            Q(last_activity_date__lt=yesterday) | Q(last_activity_date__isnull=True)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{broken.count()} streaks would be reset')
+            return
+
+        # Bounded batches keep row locks short; the outer filter is re-checked
+        # against concurrent updates, so a user who just extended a streak is skipped
+        reset = 0
+        while True:
+            updated = broken.filter(
+                pk__in=broken.values('pk')[:options['batch_size']]
+            ).update(current_streak=0)
+            if not updated:
+                break
+            reset += updated
+
+        self.stdout.write(self.style.SUCCESS(f'Reset {reset} broken streaks'))
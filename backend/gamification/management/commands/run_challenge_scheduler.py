@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from gamification.services import ChallengeEngine
+
+
+class Command(BaseCommand):
+    help = 'Activate, expire and fold the progress shards of team challenges'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of challenges flipped per UPDATE statement')
+        parser.add_argument('--fold-batch-size', type=int, default=1000,
+                            help='Number of progress shard rows folded per statement')
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help='Seconds to sleep between sweeps')
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single sweep and exit (for cron)')
+
+    def fold(self, batch_size):
+        folded = 0
+        while True:
+            rows = ChallengeEngine.fold_shards(batch_size)
+            folded += sum(rows.values())
+            # Catches completions whose post-commit check never ran (e.g. a worker died)
+            ChallengeEngine.complete_reached(list(rows))
+            if sum(rows.values()) < batch_size:
+                return folded
+
+    def sweep(self, batch_size):
+        # Expire first so challenges that ended before they were activated go straight to expired
+        counts = {}
+        for label, flip in (('expired', ChallengeEngine.expire_due), ('activated', ChallengeEngine.activate_due)):
+            counts[label] = 0
+            while True:
+                flipped = flip(batch_size)
+                counts[label] += len(flipped)
+                if len(flipped) < batch_size:
+                    break
+        return counts
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Running challenge scheduler...'))
+
+        try:
+            while True:
+                close_old_connections()
+                # Fold first so challenges that reached their target complete before expiry
+                folded = self.fold(options['fold_batch_size'])
+                counts = self.sweep(options['batch_size'])
+                counts['folded'] = folded
+                if any(counts.values()):
+                    self.stdout.write(
+                        f'Activated {counts["activated"]}, expired {counts["expired"]} challenges, '
+                        f'folded {counts["folded"]} progress shards'
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping challenge scheduler')
+
+        self.stdout.write(self.style.SUCCESS('Challenge scheduler stopped'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0003_webhookoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookconfig',
+            name='digest_window_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Roll up notifications over this many seconds into one message (0 sends each event immediately)'),
+        ),
+    ]
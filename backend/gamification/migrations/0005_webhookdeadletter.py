@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0004_webhookconfig_digest_window_seconds'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhookoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('delivered', 'Delivered')], default='pending', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='WebhookDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=50)),
+                ('payload', models.JSONField()),
+                ('attempts', models.IntegerField(default=0)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('failed_at', models.DateTimeField(auto_now_add=True)),
+                ('replayed_at', models.DateTimeField(blank=True, null=True)),
+                ('webhook', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to='gamification.webhookconfig')),
+            ],
+            options={
+                'ordering': ['-failed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    """Seed the ledger so every user's points are explained by transactions"""
+    User = apps.get_model('users', 'User')
+    PointsTransaction = apps.get_model('gamification', 'PointsTransaction')
+    PointsTransaction.objects.bulk_create(
+        (
+            PointsTransaction(user_id=user_id, amount=points, balance_after=points, reason='opening_balance')
+            for user_id, points in User.objects.exclude(points=0).values_list('id', 'points').iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0005_webhookdeadletter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointsTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('balance_after', models.IntegerField()),
+                ('reason', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='points_txn_user_created_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build daily rollups from history, counting what the live path counts
+
+    Points come from the activity rows that were actually credited to
+    User.points (task completions and achievements) plus challenge payouts
+    in the ledger; task_created and team_joined amounts were only ever
+    logged. Tasks are counted from tasks that are currently completed, on
+    the day they were completed, as sync_task_counters does.
+    """
+    ActivityLog = apps.get_model('gamification', 'ActivityLog')
+    DailyPointsRollup = apps.get_model('gamification', 'DailyPointsRollup')
+    PointsTransaction = apps.get_model('gamification', 'PointsTransaction')
+    Task = apps.get_model('projects', 'Task')
+
+    totals = {}
+
+    def add(user_id, day, category_id, points=0, tasks=0):
+        row = totals.setdefault((user_id, day, category_id), [0, 0])
+        row[0] += points or 0
+        row[1] += tasks
+
+    credited = ActivityLog.objects.filter(
+        action_type__in=['task_completed', 'achievement_earned']
+    ).annotate(
+        day=TruncDate('timestamp'),
+        category_id=Coalesce('task__project__category', 'project__category', 'team__category')
+    ).order_by().values('user_id', 'day', 'category_id').annotate(total=Sum('points_earned'))
+    for row in credited.iterator():
+        add(row['user_id'], row['day'], row['category_id'], points=row['total'])
+
+    payouts = PointsTransaction.objects.filter(reason='challenge_completed').annotate(
+        day=TruncDate('created_at')
+    ).order_by().values('user_id', 'day').annotate(total=Sum('amount'))
+    for row in payouts.iterator():
+        add(row['user_id'], row['day'], None, points=row['total'])
+
+    completed = Task.objects.filter(status='completed', assigned_to__isnull=False).annotate(
+        day=TruncDate(Coalesce('completed_at', 'updated_at'))
+    ).order_by().values('assigned_to_id', 'day', 'project__category_id').annotate(total=Count('id'))
+    for row in completed.iterator():
+        add(row['assigned_to_id'], row['day'], row['project__category_id'], tasks=row['total'])
+
+    DailyPointsRollup.objects.bulk_create(
+        (
+            DailyPointsRollup(
+                user_id=user_id, day=day, category_id=category_id, points=points, tasks_completed=tasks
+            )
+            for (user_id, day, category_id), (points, tasks) in totals.items()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0006_pointstransaction'),
+        ('projects', '0003_alter_project_options_project_category_project_team'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPointsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], default='day', max_length=10)),
+                ('points', models.IntegerField(default=0)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='gamification.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'category'], name='daily_rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'period', 'category'), name='daily_rollup_unique', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_team_aggregates(apps, schema_editor):
+    Team = apps.get_model('gamification', 'Team')
+    TeamMembership = apps.get_model('gamification', 'TeamMembership')
+    TeamChallenge = apps.get_model('gamification', 'TeamChallenge')
+    memberships = TeamMembership.objects.filter(team=OuterRef('pk')).order_by().values('team')
+    completed = TeamChallenge.objects.filter(team=OuterRef('pk'), status='completed').order_by().values('team')
+    Team.objects.update(
+        total_points=Coalesce(Subquery(memberships.annotate(total=Sum('user__points')).values('total'),
+                                       output_field=IntegerField()), Value(0)),
+        member_count=Coalesce(Subquery(memberships.annotate(n=Count('pk')).values('n'),
+                                       output_field=IntegerField()), Value(0)),
+        completed_challenges=Coalesce(Subquery(completed.annotate(n=Count('pk')).values('n'),
+                                               output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0007_dailypointsrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='completed_challenges',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='total_points',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['-total_points', 'id'], name='team_points_rank_idx'),
+        ),
+        migrations.RunPython(populate_team_aggregates, migrations.RunPython.noop),
+    ]
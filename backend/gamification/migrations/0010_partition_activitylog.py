@@ -0,0 +1,121 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:26
+
+from django.conf import settings
+from datetime import date
+
+from django.db import migrations, models
+
+TABLE = 'gamification_activitylog'
+MONTHS_AHEAD = 3
+
+# Names Django gave the foreign key indexes and constraints in 0001_initial
+FOREIGN_KEYS = [
+    ('achievement_id', 'gamification_achievement', '43cde3a6', 'gamification_activit_achievement_id_43cde3a6_fk_gamificat'),
+    ('project_id', 'projects_project', 'd471bb14', 'gamification_activit_project_id_d471bb14_fk_projects_'),
+    ('task_id', 'projects_task', '85f06c91', 'gamification_activitylog_task_id_85f06c91_fk_projects_task_id'),
+    ('team_id', 'gamification_team', 'a4d163fb', 'gamification_activit_team_id_a4d163fb_fk_gamificat'),
+    ('user_id', 'users_user', '5008c5ae', 'gamification_activitylog_user_id_5008c5ae_fk_users_user_id'),
+]
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_activity_log(apps, schema_editor):
+    """Rebuild ActivityLog as a table range-partitioned by month on timestamp
+    
+    The primary key becomes (id, timestamp) because Postgres requires the
+    partition key in it; ids still come from a single sequence. Months with
+    existing rows and the next few months get their own partitions, and a
+    default partition catches anything outside them until
+    create_activity_partitions adds the month.
+    """
+    execute = schema_editor.execute
+    execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned')
+    execute(f'ALTER TABLE {TABLE}_unpartitioned RENAME CONSTRAINT {TABLE}_pkey TO {TABLE}_unpartitioned_pkey')
+    execute(
+        f'CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned, PRIMARY KEY (id, "timestamp")) '
+        f'PARTITION BY RANGE ("timestamp")'
+    )
+    
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp")::date FROM {TABLE}_unpartitioned')
+        first_day = cursor.fetchone()[0]
+    this_month = date.today().replace(day=1)
+    month = min(first_day.replace(day=1), this_month) if first_day else this_month
+    while month <= add_months(this_month, MONTHS_AHEAD):
+        execute(
+            f'CREATE TABLE {TABLE}_p{month.year}{month.month:02d} PARTITION OF {TABLE} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [month, add_months(month, 1)]
+        )
+        month = add_months(month, 1)
+    execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+    
+    execute(f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned')
+    execute(f'DROP TABLE {TABLE}_unpartitioned')
+    
+    execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+    execute(f"SELECT setval('{TABLE}_id_seq', COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)")
+    execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+    
+    for column, target, suffix, constraint in FOREIGN_KEYS:
+        execute(f'CREATE INDEX {TABLE}_{column}_{suffix} ON {TABLE} ({column})')
+        execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) '
+            f'REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def unpartition_activity_log(apps, schema_editor):
+    """Fold the monthly partitions back into one plain ActivityLog table
+    
+    Restores the table as 0001_initial created it: primary key on id alone,
+    an identity column continuing after the highest id, and the foreign keys.
+    """
+    execute = schema_editor.execute
+    for column, target, suffix, constraint in FOREIGN_KEYS:
+        execute(f'ALTER TABLE {TABLE} DROP CONSTRAINT {constraint}')
+        execute(f'DROP INDEX {TABLE}_{column}_{suffix}')
+    execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned')
+    execute(f'ALTER TABLE {TABLE}_partitioned RENAME CONSTRAINT {TABLE}_pkey TO {TABLE}_partitioned_pkey')
+    execute(f'CREATE TABLE {TABLE} (LIKE {TABLE}_partitioned, PRIMARY KEY (id))')
+    
+    execute(f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_partitioned')
+    execute(f'DROP TABLE {TABLE}_partitioned')  # Takes the partitions and the id sequence with it
+    
+    execute(f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+    execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+        f"COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)"
+    )
+    
+    for column, target, suffix, constraint in FOREIGN_KEYS:
+        execute(f'CREATE INDEX {TABLE}_{column}_{suffix} ON {TABLE} ({column})')
+        execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {constraint} FOREIGN KEY ({column}) '
+            f'REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0009_dashboardsnapshot'),
+        ('projects', '0003_alter_project_options_project_category_project_team'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_activity_log, unpartition_activity_log, elidable=False),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'timestamp'], name='activity_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'action_type', 'timestamp'], name='activity_user_action_time_idx'),
+        ),
+    ]
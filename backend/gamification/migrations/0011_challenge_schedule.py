@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0010_partition_activitylog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='teamchallenge',
+            name='status',
+            field=models.CharField(choices=[('upcoming', 'Upcoming'), ('active', 'Active'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='upcoming', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='teamchallenge',
+            index=models.Index(condition=models.Q(('status', 'upcoming')), fields=['status', 'start_date'], name='challenge_due_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teamchallenge',
+            index=models.Index(condition=models.Q(('status__in', ['upcoming', 'active'])), fields=['status', 'end_date'], name='challenge_due_end_idx'),
+        ),
+    ]
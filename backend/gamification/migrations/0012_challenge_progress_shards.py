@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0011_challenge_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamchallenge',
+            name='progress_shards',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ChallengeProgressShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('amount', models.IntegerField(default=0)),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='gamification.teamchallenge')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('challenge', 'shard'), name='challenge_shard_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0012_challenge_progress_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookoutbox',
+            name='deferrals',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0013_webhook_outbox_deferrals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardsnapshot',
+            name='built_version',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dashboardsnapshot',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
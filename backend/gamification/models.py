@@ -40,17 +40,26 @@ class Team(models.Model):
     max_members = models.IntegerField(default=50)
     is_public = models.BooleanField(default=True)  # Can users join freely
     
+    # Aggregates kept current by the membership, points and challenge write paths;
+    # points reach total_points once the transaction that earned them commits
+    total_points = models.IntegerField(default=0)  # Sum of members' points
+    member_count = models.IntegerField(default=0)
+    completed_challenges = models.IntegerField(default=0)
+    
     def __str__(self):
         return self.name
     
     def get_member_count(self):
-        return self.members.count()
+        return self.member_count
     
     def get_total_points(self):
-        return sum(member.points for member in self.members.all())
+        return self.total_points
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-total_points', 'id'], name='team_points_rank_idx'),
+        ]
 
 
 class TeamMembership(models.Model):
@@ -64,7 +73,7 @@ class TeamMembership(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
     joined_at = models.DateTimeField(auto_now_add=True)
-    points_contributed = models.IntegerField(default=0)
+    points_contributed = models.IntegerField(default=0)  # Points earned while a member
     
     class Meta:
         unique_together = ['user', 'team']
@@ -123,6 +132,7 @@ class TeamChallenge(models.Model):
         ('active', 'Active'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),  # Ended before reaching its target
     ]
     
     name = models.CharField(max_length=255)
@@ -137,7 +147,10 @@ class TeamChallenge(models.Model):
         ('collaboration_score', 'Collaboration Score'),
     ])
     target_value = models.IntegerField()
-    current_progress = models.IntegerField(default=0)
+    current_progress = models.IntegerField(default=0)  # Excludes increments still held in shard rows
+    # Spread progress over this many ChallengeProgressShard rows so busy teams
+    # don't queue on this row's lock; 0 updates current_progress directly
+    progress_shards = models.PositiveSmallIntegerField(default=0)
     
     # Timing
     start_date = models.DateTimeField()
@@ -158,10 +171,112 @@ class TeamChallenge(models.Model):
         now = timezone.now()
         return self.start_date <= now <= self.end_date and self.status == 'active'
     
+    def get_total_progress(self):
+        """current_progress plus increments not yet folded in from shard rows
+        
+        Querysets can annotate `shard_progress` to avoid a query per challenge.
+        """
+        if hasattr(self, 'shard_progress'):
+            pending = self.shard_progress
+        else:
+            pending = self.shards.aggregate(total=models.Sum('amount'))['total'] if self.pk else 0
+        return self.current_progress + (pending or 0)
+    
     def progress_percentage(self):
         if self.target_value == 0:
             return 0
-        return min(100, (self.current_progress / self.target_value) * 100)
+        return min(100, (self.get_total_progress() / self.target_value) * 100)
+    
+    class Meta:
+        indexes = [
+            # Only challenges still waiting on the scheduler are indexed (see run_challenge_scheduler)
+            models.Index(
+                fields=['status', 'start_date'], name='challenge_due_start_idx',
+                condition=models.Q(status='upcoming')
+            ),
+            models.Index(
+                fields=['status', 'end_date'], name='challenge_due_end_idx',
+                condition=models.Q(status__in=['upcoming', 'active'])
+            ),
+        ]
+
+
+class ChallengeProgressShard(models.Model):
+    """Slice of a sharded TeamChallenge's progress, folded back by run_challenge_scheduler"""
+    challenge = models.ForeignKey(TeamChallenge, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    amount = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.challenge.name} #{self.shard}: {self.amount}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['challenge', 'shard'], name='challenge_shard_unique'),
+        ]
+
+
+class PointsTransaction(models.Model):
+    """Append-only ledger of every change to User.points"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_transactions')
+    amount = models.IntegerField()
+    balance_after = models.IntegerField()  # User.points right after this change
+    reason = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user.username} {self.amount:+d} ({self.reason})"
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='points_txn_user_created_idx'),
+        ]
+
+
+class DailyPointsRollup(models.Model):
+    """Points and completed tasks per user, day and category, for time-windowed leaderboards"""
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),  # Days folded together by compact_rollups
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()  # First day of the month for monthly rows
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, default='day')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)  # Null for points outside a category
+    points = models.IntegerField(default=0)
+    tasks_completed = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user.username} {self.day} ({self.points} points)"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'period', 'category'],
+                nulls_distinct=False,
+                name='daily_rollup_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'category'], name='daily_rollup_day_idx'),
+        ]
+
+
+class DashboardSnapshot(models.Model):
+    """Precomputed parts of a user's dashboard; marked stale whenever they change and rebuilt on read"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_snapshot')
+    data = models.JSONField()  # Teams joined, recent achievements and recent activities
+    version = models.IntegerField(default=0)  # Bumped by every invalidation
+    built_version = models.IntegerField(null=True, blank=True)  # Version `data` was built at
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def is_current(self):
+        return self.built_version == self.version
+    
+    def __str__(self):
+        return f"Dashboard for {self.user.username}"
 
 
 class GamificationConfig(models.Model):
@@ -196,6 +311,12 @@ class WebhookConfig(models.Model):
     notify_team_challenges = models.BooleanField(default=True)
     notify_milestones = models.BooleanField(default=True)
     
+    # Digest mode: buffer events and send them as one message per window
+    digest_window_seconds = models.PositiveIntegerField(
+        default=0,
+        help_text="Roll up notifications over this many seconds into one message (0 sends each event immediately)"
+    )
+    
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -203,6 +324,57 @@ class WebhookConfig(models.Model):
         return f"{self.name} ({self.platform})"
 
 
+class WebhookOutbox(models.Model):
+    """Webhook payloads waiting to be delivered by the outbox worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('in_progress', 'In Progress'),
+        ('delivered', 'Delivered'),
+    ]
+    
+    webhook = models.ForeignKey(WebhookConfig, on_delete=models.CASCADE, related_name='outbox')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    deferrals = models.IntegerField(default=0)  # Times held back by a rate limit or open circuit
+    last_error = models.TextField(blank=True)
+    
+    available_at = models.DateTimeField(default=timezone.now)  # Not claimed before this time
+    locked_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.event_type} -> {self.webhook.name} ({self.status})"
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = "Webhook outbox"
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='webhook_outbox_claim_idx'),
+        ]
+
+
+class WebhookDeadLetter(models.Model):
+    """Webhook payloads that could not be delivered, kept for inspection and replay"""
+    webhook = models.ForeignKey(WebhookConfig, on_delete=models.CASCADE, related_name='dead_letters')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    attempts = models.IntegerField(default=0)
+    status_code = models.IntegerField(null=True, blank=True)  # Last HTTP status, if any
+    last_error = models.TextField(blank=True)
+    
+    failed_at = models.DateTimeField(auto_now_add=True)
+    replayed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.event_type} -> {self.webhook.name} (failed {self.failed_at:%Y-%m-%d %H:%M})"
+    
+    class Meta:
+        ordering = ['-failed_at']
+
+
 class ActivityLog(models.Model):
     """Log of user activities for points calculation and analytics"""
     ACTION_TYPES = [
@@ -232,4 +404,9 @@ class ActivityLog(models.Model):
         return f"{self.user.username} - {self.action_type} (+{self.points_earned} points)"
     
     class Meta:
+        # Range-partitioned by month on timestamp (see migration 0010 and create_activity_partitions)
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='activity_user_time_idx'),
+            models.Index(fields=['user', 'action_type', 'timestamp'], name='activity_user_action_time_idx'),
+        ]
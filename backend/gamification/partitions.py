@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.db import connection, transaction
+
+ACTIVITY_TABLE = 'gamification_activitylog'
+ACTIVITY_DEFAULT_PARTITION = f'{ACTIVITY_TABLE}_default'
+
+
+def add_months(month, count):
+    """First day of the month `count` months after `month`"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{ACTIVITY_TABLE}_p{month.year}{month.month:02d}'
+
+
+def existing_partitions():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [ACTIVITY_TABLE]
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_month_partition(month):
+    """Create the ActivityLog partition for one month
+
+    Rows for that month that already landed in the default partition are
+    moved into the new partition before it is attached, since Postgres
+    refuses to attach a range the default partition still holds rows for.
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {ACTIVITY_TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {ACTIVITY_DEFAULT_PARTITION}
+                WHERE "timestamp" >= %s AND "timestamp" < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [start, end]
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {ACTIVITY_TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+            [start, end]
+        )
+    return moved
@@ -28,7 +28,19 @@ class TeamMembershipSerializer(serializers.ModelSerializer):
         fields = ['user', 'username', 'email', 'avatar', 'points', 'role', 'joined_at', 'points_contributed']
 
 
+class TeamMemberSummarySerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    avatar = serializers.CharField(source='user.avatar', read_only=True)
+    
+    class Meta:
+        model = TeamMembership
+        fields = ['user', 'username', 'avatar', 'role']
+
+
 class TeamSerializer(serializers.ModelSerializer):
+    """Team with its members; the `members` context key picks none, summary or full member payloads"""
+    MEMBER_MODES = ('none', 'summary', 'full')
+    
     administrator_username = serializers.CharField(source='administrator.username', read_only=True)
     category_name = serializers.CharField(source='category.display_name', read_only=True)
     member_count = serializers.SerializerMethodField()
@@ -45,6 +57,16 @@ class TeamSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        mode = self.context.get('members', 'full')
+        if mode == 'none':
+            self.fields.pop('members')
+        elif mode == 'summary':
+            self.fields['members'] = TeamMemberSummarySerializer(
+                source='teammembership_set', many=True, read_only=True
+            )
+    
     def get_member_count(self, obj):
         return obj.get_member_count()
     
@@ -85,6 +107,7 @@ class UserAchievementSerializer(serializers.ModelSerializer):
 class TeamChallengeSerializer(serializers.ModelSerializer):
     team_name = serializers.CharField(source='team.name', read_only=True)
     created_by_username = serializers.CharField(source='created_by.username', read_only=True)
+    current_progress = serializers.IntegerField(source='get_total_progress', read_only=True)
     progress_percentage = serializers.SerializerMethodField()
     is_active = serializers.SerializerMethodField()
     
@@ -93,7 +116,7 @@ class TeamChallengeSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'description', 'team', 'team_name',
             'target_type', 'target_value', 'current_progress', 'progress_percentage',
-            'start_date', 'end_date', 'status', 'is_active',
+            'start_date', 'end_date', 'status', 'is_active', 'progress_shards',
             'points_reward', 'badge_reward', 'created_by', 'created_by_username'
         ]
         read_only_fields = ['id', 'current_progress', 'created_by']
@@ -138,6 +161,15 @@ class LeaderboardSerializer(serializers.Serializer):
     rank = serializers.IntegerField()
 
 
+class PeriodLeaderboardSerializer(serializers.Serializer):
+    user_id = serializers.IntegerField()
+    username = serializers.CharField()
+    avatar = serializers.CharField()
+    points = serializers.IntegerField()
+    tasks_completed = serializers.IntegerField()
+    rank = serializers.IntegerField()
+
+
 class TeamLeaderboardSerializer(serializers.Serializer):
     team_id = serializers.IntegerField()
     team_name = serializers.CharField()
@@ -146,15 +178,3 @@ class TeamLeaderboardSerializer(serializers.Serializer):
     member_count = serializers.IntegerField()
     completed_challenges = serializers.IntegerField()
     rank = serializers.IntegerField()
-
-
-class GamificationStatsSerializer(serializers.Serializer):
-    total_points = serializers.IntegerField()
-    achievements_earned = serializers.IntegerField()
-    tasks_completed = serializers.IntegerField()
-    current_streak = serializers.IntegerField()
-    longest_streak = serializers.IntegerField()
-    teams_joined = serializers.IntegerField()
-    rank_position = serializers.IntegerField()
-    recent_achievements = UserAchievementSerializer(many=True)
-    recent_activities = ActivityLogSerializer(many=True)
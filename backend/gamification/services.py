@@ -1,21 +1,110 @@
-import requests
 import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone as dt_timezone
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db import IntegrityError, connection, transaction
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from .models import (
-    ActivityLog, UserAchievement, Achievement, GamificationConfig,
-    WebhookConfig, TeamChallenge
+    ActivityLog, UserAchievement, Achievement, GamificationConfig, PointsTransaction, DailyPointsRollup, DashboardSnapshot,
+    Team, TeamMembership, WebhookConfig, WebhookOutbox, WebhookDeadLetter, TeamChallenge,
+    ChallengeProgressShard
 )
+from .webhooks import WebhookDispatcher
 from users.models import User
 
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """Collects ActivityLog rows and writes them with a single bulk_create
+    
+    Used as a context manager, entries logged inside the block are written when
+    it exits, or when the surrounding transaction commits. Without one,
+    log_activity still buffers inside a transaction: each savepoint level gets
+    its own buffer flushed on commit, so a rolled-back savepoint drops its entries.
+    """
+    _local = threading.local()
+    
+    def __init__(self):
+        self.entries = []
+    
+    def __enter__(self):
+        self._stack().append(self)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack().pop()
+        if exc_type is not None:
+            self.entries = []
+        elif connection.in_atomic_block:
+            transaction.on_commit(self.flush)
+        else:
+            self.flush()
+        return False
+    
+    @classmethod
+    def _stack(cls):
+        if not hasattr(cls._local, 'stack'):
+            cls._local.stack = []
+            cls._local.transaction_buffers = {}
+        return cls._local.stack
+    
+    @classmethod
+    def current(cls):
+        """Buffer log_activity should add to, or None to write immediately"""
+        stack = cls._stack()
+        if stack:
+            return stack[-1]
+        if not connection.in_atomic_block:
+            return None
+        
+        # Buffers whose flush is no longer queued belong to finished transactions
+        buffers = {
+            key: buffer for key, buffer in cls._local.transaction_buffers.items() if buffer.pending()
+        }
+        key = tuple(sid for sid in connection.savepoint_ids if sid)
+        if key not in buffers:
+            buffers[key] = cls()
+            transaction.on_commit(buffers[key].flush)
+        cls._local.transaction_buffers = buffers
+        return buffers[key]
+    
+    def pending(self):
+        return any(hook[1] == self.flush for hook in connection.run_on_commit)
+    
+    def add(self, entry):
+        self.entries.append(entry)
+    
+    def flush(self):
+        entries, self.entries = self.entries, []
+        if entries:
+            ActivityLog.objects.bulk_create(entries)
+            # Snapshots go stale only once the rows they would show exist
+            DashboardService.mark_stale({entry.user_id for entry in entries})
+        return entries
+
 
 class GamificationService:
     """Service for handling gamification logic"""
     
+    # Denormalized User counter behind each counter-based achievement type
+    ACHIEVEMENT_COUNTERS = {
+        'task_completion': 'tasks_completed',
+        'collaboration': 'collaboration_completed',
+        'leadership': 'projects_created',
+    }
+    
     @staticmethod
     def log_activity(user, action_type, points_earned=0, **kwargs):
-        """Log user activity"""
-        return ActivityLog.objects.create(
+        """Log user activity, buffered until the current ActivityBuffer or transaction ends"""
+        entry = ActivityLog(
             user=user,
             action_type=action_type,
             points_earned=points_earned,
@@ -25,16 +114,272 @@ class GamificationService:
             achievement=kwargs.get('achievement'),
             metadata=kwargs.get('metadata', {})
         )
+        buffer = ActivityBuffer.current()
+        if buffer is None:
+            entry.save()
+            DashboardService.invalidate(user.pk)
+        else:
+            buffer.add(entry)
+        return entry
     
     @staticmethod
-    def update_user_points(user, points):
-        user.points += points
-        user.save(update_fields=['points'])
+    def update_user_points(user, points, reason='adjustment', category_id=None):
+        """Add points with a single UPDATE ... RETURNING and record it in the ledger"""
+        if not points:
+            return user.points
+        
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {User._meta.db_table} SET points = points + %s WHERE id = %s RETURNING points',
+                    [points, user.pk]
+                )
+                row = cursor.fetchone()
+            if row is None:
+                return user.points
+            
+            user.points = row[0]
+            PointsTransaction.objects.create(
+                user=user,
+                amount=points,
+                balance_after=user.points,
+                reason=reason
+            )
+            GamificationService.record_rollup([user.pk], points=points, category_id=category_id)
+            GamificationService.adjust_team_points([user.pk], points)
+        return user.points
+    
+    @staticmethod
+    def award_points_bulk(user_ids, points, reason, category_id=None):
+        """Give the same number of points to many users in one UPDATE statement"""
+        user_ids = list(user_ids)
+        if not points or not user_ids:
+            return {}
+        
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {User._meta.db_table} SET points = points + %s WHERE id = ANY(%s) RETURNING id, points',
+                    [points, user_ids]
+                )
+                balances = dict(cursor.fetchall())
+            PointsTransaction.objects.bulk_create([
+                PointsTransaction(user_id=user_id, amount=points, balance_after=balance, reason=reason)
+                for user_id, balance in balances.items()
+            ])
+            GamificationService.record_rollup(list(balances), points=points, category_id=category_id)
+            GamificationService.adjust_team_points(list(balances), points)
+        return balances
+    
+    @staticmethod
+    def adjust_team_points(user_ids, points):
+        """Credit a points change to the users' memberships now and their teams' totals after commit
+        
+        A membership row belongs to one user, but a team row is shared by all
+        its members; updating it only once the transaction has committed keeps
+        its lock out of completion transactions, so members of a busy team
+        don't queue behind each other.
+        """
+        if not user_ids or not points:
+            return
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {TeamMembership._meta.db_table}
+                SET points_contributed = points_contributed + %s
+                WHERE user_id = ANY(%s)
+                RETURNING team_id
+                """,
+                [points, list(user_ids)]
+            )
+            team_points = {}
+            for (team_id,) in cursor.fetchall():
+                team_points[team_id] = team_points.get(team_id, 0) + points
+        if team_points:
+            transaction.on_commit(lambda: GamificationService.add_team_points(team_points))
+    
+    @staticmethod
+    def add_team_points(team_points):
+        """Add {team id: points} to the teams' totals in one short statement"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Team._meta.db_table} AS team
+                SET total_points = team.total_points + delta.points
+                FROM unnest(%s::bigint[], %s::integer[]) AS delta(team_id, points)
+                WHERE team.id = delta.team_id
+                """,
+                [list(team_points), list(team_points.values())]
+            )
+    
+    @staticmethod
+    def adjust_team_membership(membership, joined):
+        """Add or remove a member's count and points from the team totals"""
+        DashboardService.invalidate(membership.user_id)
+        sign = 1 if joined else -1
+        member_points = User.objects.filter(pk=membership.user_id).values('points')[:1]
+        Team.objects.filter(pk=membership.team_id).update(
+            member_count=F('member_count') + sign,
+            total_points=F('total_points') + sign * Coalesce(Subquery(member_points), Value(0))
+        )
+    
+    @staticmethod
+    def refresh_team_points(team_ids):
+        """Recount the teams' total_points from their members' current points"""
+        member_points = TeamMembership.objects.filter(
+            team=OuterRef('pk')
+        ).order_by().values('team').annotate(total=Sum('user__points')).values('total')
+        Team.objects.filter(pk__in=team_ids).update(
+            total_points=Coalesce(Subquery(member_points, output_field=IntegerField()), Value(0))
+        )
+    
+    @staticmethod
+    def refresh_completed_challenges(team_id):
+        """Recount a team's completed challenges"""
+        completed = TeamChallenge.objects.filter(
+            team=OuterRef('pk'), status='completed'
+        ).order_by().values('team').annotate(n=Count('pk')).values('n')
+        Team.objects.filter(pk=team_id).update(
+            completed_challenges=Coalesce(Subquery(completed, output_field=IntegerField()), Value(0))
+        )
+    
+    @staticmethod
+    def record_rollup(user_ids, points=0, tasks_completed=0, category_id=None, day=None):
+        """Add to today's DailyPointsRollup rows with one upsert, creating them as needed"""
+        if not user_ids or not (points or tasks_completed):
+            return
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {DailyPointsRollup._meta.db_table}
+                    (user_id, day, period, category_id, points, tasks_completed)
+                SELECT user_id, %s, 'day', %s, %s, %s FROM unnest(%s::bigint[]) AS user_id
+                ON CONFLICT ON CONSTRAINT daily_rollup_unique DO UPDATE SET
+                    points = {DailyPointsRollup._meta.db_table}.points + EXCLUDED.points,
+                    tasks_completed = {DailyPointsRollup._meta.db_table}.tasks_completed + EXCLUDED.tasks_completed
+                """,
+                [day or timezone.localdate(), category_id, points, tasks_completed, list(user_ids)]
+            )
+    
+    @staticmethod
+    def adjust_user_counters(user_id, **deltas):
+        """Atomically add to denormalized User counters, e.g. tasks_completed=1
+        
+        Returns {field: value right after this change} for the changed fields,
+        read from the same UPDATE so concurrent changes can't blur it.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not user_id or not deltas:
+            return {}
+        
+        fields = list(deltas)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {User._meta.db_table}
+                SET {', '.join(f'{field} = {field} + %s' for field in fields)}
+                WHERE id = %s
+                RETURNING {', '.join(fields)}
+                """,
+                [*deltas.values(), user_id]
+            )
+            row = cursor.fetchone()
+        return dict(zip(fields, row)) if row else {}
+    
+    @staticmethod
+    def sync_task_counters(task, deleted=False):
+        """Move completion counters when a task enters or leaves the completed state
+        
+        Rollups are history: a reopened or reassigned task is debited on the
+        day it was completed, and a deleted one is left in them, since its
+        assignee may be the user whose deletion is removing it.
+        
+        Returns the assignee's counters right after the task was newly counted
+        for them (see adjust_user_counters), or None.
+        """
+        def counted(status, assignee_id, creator_id):
+            if status == 'completed' and assignee_id:
+                return assignee_id, creator_id
+            return None
+        
+        before = counted(
+            task.loaded_value('status'),
+            task.loaded_value('assigned_to_id'),
+            task.loaded_value('created_by_id')
+        )
+        after = None if deleted else counted(task.status, task.assigned_to_id, task.created_by_id)
+        if before == after:
+            return None
+        
+        category_id = task.project.category_id
+        if before:
+            assignee_id, creator_id = before
+            GamificationService.adjust_user_counters(
+                assignee_id,
+                tasks_completed=-1,
+                collaboration_completed=-1 if assignee_id != creator_id else 0
+            )
+            if not deleted:
+                completed_at = task.loaded_value('completed_at')
+                GamificationService.record_rollup(
+                    [assignee_id], tasks_completed=-1, category_id=category_id,
+                    day=timezone.localdate(completed_at) if completed_at else None
+                )
+        if not after:
+            return None
+        assignee_id, creator_id = after
+        counters = GamificationService.adjust_user_counters(
+            assignee_id,
+            tasks_completed=1,
+            collaboration_completed=1 if assignee_id != creator_id else 0
+        )
+        GamificationService.record_rollup([assignee_id], tasks_completed=1, category_id=category_id)
+        return counters
+    
+    @staticmethod
+    def reward_task_completion(task, counters=None):
+        """Points, streak, achievements, team challenges and webhooks for a newly completed task
+        
+        `counters` are the assignee's counters as returned by sync_task_counters
+        when the task was counted.
+        """
+        points_earned = GamificationService.get_points_config('task_completed', 100)
+        
+        # Bonus points for priority
+        if task.priority == 'high':
+            points_earned += GamificationService.get_points_config('high_priority_bonus', 50)
+        elif task.priority == 'medium':
+            points_earned += GamificationService.get_points_config('medium_priority_bonus', 25)
+        
+        # Activity rows from this completion (including achievements) go out in one INSERT
+        with transaction.atomic(), ActivityBuffer():
+            GamificationService.log_activity(
+                user=task.assigned_to,
+                action_type='task_completed',
+                task=task,
+                project=task.project,
+                points_earned=points_earned
+            )
+            
+            GamificationService.update_user_points(
+                task.assigned_to, points_earned, 'task_completed', category_id=task.project.category_id
+            )
+            GamificationService.update_user_streak(task.assigned_to)
+            
+            deltas = {'task_completion': 1}
+            if task.created_by_id != task.assigned_to_id:
+                deltas['collaboration'] = 1
+            GamificationService.check_and_award_achievements(task.assigned_to, deltas, counters)
+            
+            ChallengeEngine.task_completed(task, points_earned)
+            WebhookService.send_task_completion_notification(task)
     
     @staticmethod
     def award_points(user, action_type, points):
         """Award points to user and log activity"""
-        GamificationService.update_user_points(user, points)
+        GamificationService.update_user_points(user, points, action_type)
         
         GamificationService.log_activity(
             user=user,
@@ -64,182 +409,756 @@ class GamificationService:
     
     @staticmethod
     def update_user_streak(user):
-        """Update user streak based on recent activity"""
-        today = timezone.now().date()
-        yesterday = today - timezone.timedelta(days=1)
+        """Extend, start or keep the user's daily streak from last_activity_date"""
+        today = timezone.localdate()
+        last_activity_date = user.last_activity_date
+        if last_activity_date == today:
+            return
         
-        # Check if user has activity today
-        has_activity_today = ActivityLog.objects.filter(
-            user=user,
-            timestamp__date=today,
-            action_type='task_completed'
-        ).exists()
+        previous_streak = user.current_streak
+        if last_activity_date == today - timezone.timedelta(days=1):
+            current_streak = previous_streak + 1
+        else:
+            current_streak = 1
+        longest_streak = max(user.longest_streak, current_streak)
+        
+        # Compare-and-set on last_activity_date so concurrent completions count once
+        updated = User.objects.filter(
+            pk=user.pk, last_activity_date=last_activity_date
+        ).update(
+            current_streak=current_streak,
+            longest_streak=longest_streak,
+            last_activity_date=today
+        )
+        if not updated:
+            user.refresh_from_db(fields=['current_streak', 'longest_streak', 'last_activity_date'])
+            return
         
-        # Check if user had activity yesterday
-        has_activity_yesterday = ActivityLog.objects.filter(
+        user.current_streak = current_streak
+        user.longest_streak = longest_streak
+        user.last_activity_date = today
+        AchievementEngine.award(user, {'streak': current_streak}, {'streak': previous_streak})
+    
+    @staticmethod
+    def check_and_award_achievements(user, deltas=None, counters=None):
+        """Award achievements whose thresholds the user's counters have reached
+        
+        `deltas` maps achievement types to how much their counter just moved;
+        when given, only those types are evaluated and only thresholds crossed
+        by the move are considered. Without it every type is checked in full.
+        `counters` are the values the move produced (from adjust_user_counters);
+        without them the counters are re-read, which can skip a threshold when
+        another move lands in between.
+        """
+        if counters is None:
+            user.refresh_from_db(fields=list(GamificationService.ACHIEVEMENT_COUNTERS.values()))
+            counters = {}
+        
+        metrics, previous = {}, {}
+        for achievement_type, counter in GamificationService.ACHIEVEMENT_COUNTERS.items():
+            if deltas is not None and not deltas.get(achievement_type):
+                continue
+            metrics[achievement_type] = counters.get(counter, getattr(user, counter))
+            if deltas is not None:
+                previous[achievement_type] = metrics[achievement_type] - deltas[achievement_type]
+        
+        return AchievementEngine.award(user, metrics, previous)
+    
+    @staticmethod
+    def reward_achievement(user, achievement):
+        """Grant the points, activity entry and notifications for a newly earned achievement"""
+        GamificationService.update_user_points(user, achievement.points_reward, 'achievement_earned')
+        
+        GamificationService.log_activity(
             user=user,
-            timestamp__date=yesterday,
-            action_type='task_completed'
-        ).exists()
-        
-        if has_activity_today:
-            if has_activity_yesterday or user.current_streak == 0:
-                user.current_streak += 1
-            user.last_activity_date = today
-            
-            # Update longest streak
-            if user.current_streak > user.longest_streak:
-                user.longest_streak = user.current_streak
-                
-        elif not has_activity_yesterday and user.current_streak > 0:
-            # Streak broken
-            user.current_streak = 0
+            action_type='achievement_earned',
+            achievement=achievement,
+            points_earned=achievement.points_reward
+        )
         
-        user.save(update_fields=['current_streak', 'longest_streak', 'last_activity_date'])
+        WebhookService.send_achievement_notification(user, achievement)
     
     @staticmethod
-    def check_and_award_achievements(user):
-        # Task completion achievements
-        tasks_completed = user.assigned_tasks.filter(status='completed').count()
-        task_achievements = Achievement.objects.filter(
-            type='task_completion',
-            required_value__lte=tasks_completed,
-            is_active=True
+    def achievement_metrics(user, achievement_types=None):
+        """Every metric achievements are measured against, each computed once
+        
+        Counter metrics come from User; per-category completed tasks and
+        completed team challenges take one grouped query each, and only when
+        `achievement_types` (default: all) needs them.
+        """
+        metrics = {'streak': user.current_streak}
+        for achievement_type, field in GamificationService.ACHIEVEMENT_COUNTERS.items():
+            metrics[achievement_type] = getattr(user, field)
+        
+        if achievement_types is None or 'category_specific' in achievement_types:
+            from projects.models import Task
+            metrics['category_specific'] = dict(
+                Task.objects.filter(assigned_to=user, status='completed').order_by()
+                .values_list('project__category').annotate(n=Count('id'))
+            )
+        if achievement_types is None or 'team_challenge' in achievement_types:
+            metrics['team_challenge'] = dict(
+                TeamChallenge.objects.filter(
+                    team__in=TeamMembership.objects.filter(user=user).values('team'), status='completed'
+                ).order_by().values_list('team__category').annotate(n=Count('id'))
+            )
+        return metrics
+    
+    @staticmethod
+    def calculate_achievement_progress(user, achievement, metrics=None):
+        if metrics is None:
+            metrics = GamificationService.achievement_metrics(user, [achievement.type])
+        
+        value = metrics.get(achievement.type, 0)
+        if isinstance(value, dict):
+            # Per-category metrics: one category, or all of them for uncategorized achievements
+            return value.get(achievement.category_id, 0) if achievement.category_id else sum(value.values())
+        return value
+    
+    @staticmethod
+    def get_points_config(config_name, default_value):
+        """Get points configuration value"""
+        return ConfigCache.get(config_name, default_value)
+
+
+class ConfigCache:
+    """Process-local snapshot of active GamificationConfig values, keyed by name
+    
+    Saves in this process invalidate it through signals. Other workers notice
+    changes by polling a cheap version fingerprint (row count and latest
+    updated_at) at most every GAMIFICATION_CONFIG_POLL_SECONDS.
+    """
+    
+    _values = None
+    _version = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def _current_version():
+        version = GamificationConfig.objects.aggregate(
+            count=Count('id'), updated_at=Max('updated_at')
         )
+        return version['count'], version['updated_at']
+    
+    @classmethod
+    def invalidate(cls):
+        cls._values = None
+    
+    @classmethod
+    def values(cls):
+        values = cls._values
+        now = time.monotonic()
+        if values is not None and now - cls._checked_at < settings.GAMIFICATION_CONFIG_POLL_SECONDS:
+            return values
         
-        for achievement in task_achievements:
-            user_achievement, created = UserAchievement.objects.get_or_create(
-                user=user,
-                achievement=achievement,
-                defaults={'progress': tasks_completed}
+        with cls._lock:
+            version = cls._current_version()
+            if cls._values is None or version != cls._version:
+                cls._values = dict(
+                    GamificationConfig.objects.filter(is_active=True).values_list('name', 'value')
+                )
+                cls._version = version
+            cls._checked_at = now
+            return cls._values
+    
+    @classmethod
+    def get(cls, name, default=None):
+        return cls.values().get(name, default)
+
+
+class AchievementEngine:
+    """Awards achievements using an in-memory, per-type index of unlock thresholds"""
+    
+    INDEX_TTL_SECONDS = 300  # Rebuild periodically so other workers' edits are picked up
+    
+    _index = None
+    _built_at = 0.0
+    _lock = threading.Lock()
+    
+    @classmethod
+    def invalidate(cls):
+        cls._index = None
+    
+    @classmethod
+    def index(cls):
+        """{type: (sorted thresholds, achievements in the same order)} for active achievements"""
+        index = cls._index
+        if index is None or time.monotonic() - cls._built_at > cls.INDEX_TTL_SECONDS:
+            with cls._lock:
+                index = {}
+                for achievement in Achievement.objects.filter(is_active=True).order_by('required_value', 'id'):
+                    thresholds, achievements = index.setdefault(achievement.type, ([], []))
+                    thresholds.append(achievement.required_value)
+                    achievements.append(achievement)
+                cls._index, cls._built_at = index, time.monotonic()
+        return index
+    
+    @classmethod
+    def crossed(cls, achievement_type, value, previous=None):
+        """Achievements unlocked by a counter moving from `previous` (exclusive) to `value`"""
+        thresholds, achievements = cls.index().get(achievement_type, ([], []))
+        low = 0 if previous is None else bisect_right(thresholds, previous)
+        return achievements[low:bisect_right(thresholds, value)]
+    
+    @classmethod
+    def award(cls, user, metrics, previous=None):
+        """Create UserAchievement rows for thresholds crossed by `metrics` and reward them
+        
+        Returns the newly earned achievements.
+        """
+        previous = previous or {}
+        candidates = {}
+        for achievement_type, value in metrics.items():
+            for achievement in cls.crossed(achievement_type, value, previous.get(achievement_type)):
+                candidates[achievement.id] = (achievement, value)
+        if not candidates:
+            return []
+        
+        for _ in range(2):
+            earned_ids = set(UserAchievement.objects.filter(
+                user=user, achievement_id__in=candidates
+            ).values_list('achievement_id', flat=True))
+            new_rows = [
+                UserAchievement(user=user, achievement=achievement, progress=value)
+                for achievement_id, (achievement, value) in candidates.items()
+                if achievement_id not in earned_ids
+            ]
+            if not new_rows:
+                return []
+            try:
+                with transaction.atomic():
+                    UserAchievement.objects.bulk_create(new_rows)
+                    GamificationService.adjust_user_counters(user.pk, achievements_count=len(new_rows))
+                break
+            except IntegrityError:
+                continue  # A concurrent request awarded some of them; re-read and retry once
+        else:
+            return []
+        
+        earned = [row.achievement for row in new_rows]
+        for achievement in earned:
+            GamificationService.reward_achievement(user, achievement)
+        return earned
+
+
+class ChallengeCache:
+    """Process-local ids of each team's running or upcoming challenges
+    
+    Lets the task completion path skip teams without challenges and narrow
+    the progress UPDATE to a few primary keys. Edits in this process
+    invalidate a team through signals; other workers pick changes up within
+    CHALLENGE_CACHE_SECONDS. Stale ids are harmless because the UPDATE
+    re-checks status and dates.
+    """
+    
+    _teams = {}  # Team id -> (challenge ids, monotonic time loaded)
+    _lock = threading.Lock()
+    
+    @classmethod
+    def invalidate(cls, team_id=None):
+        with cls._lock:
+            if team_id is None:
+                cls._teams = {}
+            else:
+                cls._teams.pop(team_id, None)
+    
+    @classmethod
+    def challenge_ids(cls, team_ids):
+        now = time.monotonic()
+        challenge_ids, missing = [], []
+        for team_id in team_ids:
+            cached = cls._teams.get(team_id)
+            if cached is None or now - cached[1] > settings.CHALLENGE_CACHE_SECONDS:
+                missing.append(team_id)
+            else:
+                challenge_ids.extend(cached[0])
+        
+        if missing:
+            loaded = {team_id: [] for team_id in missing}
+            for challenge_id, team_id in TeamChallenge.objects.filter(
+                team_id__in=missing, status__in=['upcoming', 'active'], end_date__gte=timezone.now()
+            ).values_list('id', 'team_id'):
+                loaded[team_id].append(challenge_id)
+            with cls._lock:
+                for team_id, team_challenge_ids in loaded.items():
+                    cls._teams[team_id] = (team_challenge_ids, now)
+                    challenge_ids.extend(team_challenge_ids)
+        return challenge_ids
+
+
+class ChallengeEngine:
+    """Advances team challenges from gamification events
+    
+    Each target type has an evaluator returning how much an event adds to
+    challenges of that type. Progress moves with one UPDATE ... RETURNING and
+    a challenge is completed by a guarded status flip, so concurrent events
+    can never pay the same challenge twice.
+    """
+    
+    @staticmethod
+    def evaluate_tasks_completed(event):
+        return 1 if event['type'] == 'task_completed' else 0
+    
+    @staticmethod
+    def evaluate_points_earned(event):
+        return event.get('points', 0) if event['type'] == 'task_completed' else 0
+    
+    @staticmethod
+    def evaluate_projects_finished(event):
+        return 1 if event['type'] == 'project_finished' else 0
+    
+    @staticmethod
+    def evaluate_collaboration_score(event):
+        # Completing a task someone else created counts as collaboration, as for achievements
+        task = event.get('task')
+        return 1 if event['type'] == 'task_completed' and task.created_by_id != task.assigned_to_id else 0
+    
+    @classmethod
+    def evaluators(cls):
+        return {
+            target_type: getattr(cls, f'evaluate_{target_type}')
+            for target_type, _ in TeamChallenge._meta.get_field('target_type').choices
+        }
+    
+    @classmethod
+    def task_completed(cls, task, points):
+        """Credit a completed task to the running challenges of its assignee's teams"""
+        if not task.assigned_to_id:
+            return []
+        team_ids = TeamMembership.objects.filter(user_id=task.assigned_to_id).values_list('team_id', flat=True)
+        return cls.record({'type': 'task_completed', 'task': task, 'points': points}, team_ids)
+    
+    @classmethod
+    def project_finished(cls, project):
+        """Credit a finished project to its team's running challenges"""
+        if not project.team_id:
+            return []
+        return cls.record({'type': 'project_finished', 'project': project}, [project.team_id])
+    
+    @classmethod
+    def record(cls, event, team_ids):
+        """Add an event to the teams' active challenges and return the ones it completed"""
+        amounts = {target_type: evaluate(event) for target_type, evaluate in cls.evaluators().items()}
+        amounts = {target_type: amount for target_type, amount in amounts.items() if amount}
+        if not amounts:
+            return []
+        challenge_ids = ChallengeCache.challenge_ids(team_ids)
+        if not challenge_ids:
+            return []
+        
+        now = timezone.now()
+        challenges = TeamChallenge._meta.db_table
+        shards = ChallengeProgressShard._meta.db_table
+        with connection.cursor() as cursor:
+            # Unsharded challenges are bumped in place; sharded ones add to a random
+            # shard row instead so concurrent completions don't queue on one lock
+            cursor.execute(
+                f"""
+                WITH targets AS (
+                    SELECT challenge.id, challenge.progress_shards, delta.amount
+                    FROM {challenges} AS challenge
+                    JOIN unnest(%s::varchar[], %s::integer[]) AS delta(target_type, amount)
+                        ON challenge.target_type = delta.target_type
+                    WHERE challenge.id = ANY(%s)
+                        AND challenge.status = 'active'
+                        AND challenge.start_date <= %s
+                        AND challenge.end_date >= %s
+                ),
+                bumped AS (
+                    UPDATE {challenges} AS challenge
+                    SET current_progress = challenge.current_progress + targets.amount
+                    FROM targets
+                    WHERE challenge.id = targets.id
+                        AND targets.progress_shards = 0
+                        AND challenge.status = 'active'
+                    RETURNING challenge.id, challenge.current_progress >= challenge.target_value AS reached
+                ),
+                sharded AS (
+                    INSERT INTO {shards} (challenge_id, shard, amount)
+                    SELECT id, floor(random() * progress_shards)::integer, amount
+                    FROM targets WHERE progress_shards > 0
+                    ON CONFLICT ON CONSTRAINT challenge_shard_unique DO UPDATE
+                        SET amount = {shards}.amount + EXCLUDED.amount
+                    RETURNING challenge_id
+                )
+                SELECT id, reached FROM bumped
+                UNION ALL
+                SELECT challenge_id, NULL FROM sharded
+                """,
+                [list(amounts), list(amounts.values()), challenge_ids, now, now]
             )
+            rows = cursor.fetchall()
+        
+        # A sharded total is only complete once every concurrent increment has
+        # committed, so it is checked after commit; the last committer sees it
+        sharded = [challenge_id for challenge_id, reached in rows if reached is None]
+        if sharded:
+            transaction.on_commit(lambda: cls.complete_reached(sharded))
+        
+        completed = [cls.complete(challenge_id) for challenge_id, reached in rows if reached]
+        return [challenge for challenge in completed if challenge is not None]
+    
+    @classmethod
+    def complete_reached(cls, challenge_ids):
+        """Complete the given active challenges whose shard-inclusive progress hit the target"""
+        reached = TeamChallenge.objects.filter(
+            pk__in=challenge_ids, status='active'
+        ).annotate(
+            shard_progress=Coalesce(Sum('shards__amount'), 0)
+        ).filter(
+            target_value__lte=F('current_progress') + F('shard_progress')
+        ).values_list('id', flat=True)
+        completed = [cls.complete(challenge_id) for challenge_id in reached]
+        return [challenge for challenge in completed if challenge is not None]
+    
+    @classmethod
+    def complete(cls, challenge_id):
+        """Mark a challenge completed and reward the team, or return None if it already was"""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Concurrent callers queue on the row lock; only the first still sees 'active'
+                cursor.execute(
+                    f"""
+                    SELECT status, current_progress, target_value
+                    FROM {TeamChallenge._meta.db_table} WHERE id = %s FOR UPDATE
+                    """,
+                    [challenge_id]
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                status, current_progress, target_value = row
+                if status != 'active':
+                    return None
+                
+                # Shards are summed in a new statement so its snapshot includes any
+                # fold that committed while we waited; one statement would add the
+                # folded amount twice, once in current_progress and once as shards
+                cursor.execute(
+                    f"SELECT COALESCE(SUM(amount), 0) FROM {ChallengeProgressShard._meta.db_table} WHERE challenge_id = %s",
+                    [challenge_id]
+                )
+                if current_progress + cursor.fetchone()[0] < target_value:
+                    return None
+                
+                cursor.execute(
+                    f"UPDATE {TeamChallenge._meta.db_table} SET status = 'completed' WHERE id = %s",
+                    [challenge_id]
+                )
             
-            if not created:
-                user_achievement.progress = tasks_completed
-                user_achievement.save()
-        
-        # Collaboration achievements
-        assigned_tasks_completed = user.assigned_tasks.filter(
-            status='completed'
-        ).exclude(created_by=user).count()
-        
-        collab_achievements = Achievement.objects.filter(
-            type='collaboration',
-            required_value__lte=assigned_tasks_completed,
-            is_active=True
+            challenge = TeamChallenge.objects.select_related('team', 'badge_reward').get(pk=challenge_id)
+            # The raw UPDATE skips post_save, so the team's counter is bumped here
+            Team.objects.filter(pk=challenge.team_id).update(completed_challenges=F('completed_challenges') + 1)
+            
+            member_ids = list(
+                TeamMembership.objects.filter(team_id=challenge.team_id).values_list('user_id', flat=True)
+            )
+            GamificationService.award_points_bulk(
+                member_ids, challenge.points_reward, 'challenge_completed', category_id=challenge.team.category_id
+            )
+            if challenge.badge_reward_id:
+                cls.award_badge(challenge.badge_reward, member_ids)
+            WebhookService.send_challenge_notifications([challenge], 'challenge_completed')
+        return challenge
+    
+    @classmethod
+    def fold_shards(cls, batch_size=1000):
+        """Move one batch of shard rows into their challenges' current_progress
+        
+        Rows are deleted and added to the challenge in one statement, so the
+        shard-inclusive total never changes. Shards being incremented right now
+        are skipped and picked up by the next fold. Returns {challenge id:
+        shard rows folded}.
+        """
+        shards = ChallengeProgressShard._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH folded AS (
+                    DELETE FROM {shards}
+                    WHERE id IN (
+                        SELECT id FROM {shards} ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING challenge_id, amount
+                ),
+                totals AS (
+                    SELECT challenge_id, SUM(amount) AS amount, COUNT(*) AS n FROM folded GROUP BY challenge_id
+                ),
+                updated AS (
+                    UPDATE {TeamChallenge._meta.db_table} AS challenge
+                    SET current_progress = challenge.current_progress + totals.amount
+                    FROM totals
+                    WHERE challenge.id = totals.challenge_id
+                )
+                SELECT challenge_id, n FROM totals
+                """,
+                [batch_size]
+            )
+            return dict(cursor.fetchall())
+    
+    @classmethod
+    def _flip(cls, sql, params, event_type):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                flipped = [row[0] for row in cursor.fetchall()]
+            if flipped:
+                WebhookService.send_challenge_notifications(
+                    TeamChallenge.objects.filter(pk__in=flipped).select_related('team').annotate(
+                        shard_progress=Coalesce(Sum('shards__amount'), 0)
+                    ),
+                    event_type
+                )
+        return flipped
+    
+    @classmethod
+    def activate_due(cls, batch_size=500):
+        """Move one batch of upcoming challenges whose start date has passed to active
+        
+        Status literals match the partial index predicates so the planner can
+        use them; SKIP LOCKED lets several schedulers run side by side.
+        Returns the ids of the activated challenges.
+        """
+        table = TeamChallenge._meta.db_table
+        now = timezone.now()
+        return cls._flip(
+            f"""
+            UPDATE {table} SET status = 'active'
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE status = 'upcoming' AND start_date <= %s AND end_date >= %s
+                ORDER BY start_date
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+            """,
+            [now, now, batch_size],
+            'challenge_started'
         )
+    
+    @classmethod
+    def expire_due(cls, batch_size=500):
+        """Move one batch of upcoming or active challenges past their end date to expired
         
-        for achievement in collab_achievements:
-            user_achievement, created = UserAchievement.objects.get_or_create(
-                user=user,
-                achievement=achievement,
-                defaults={'progress': assigned_tasks_completed}
+        Returns the ids of the expired challenges.
+        """
+        table = TeamChallenge._meta.db_table
+        return cls._flip(
+            f"""
+            UPDATE {table} SET status = 'expired'
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE status IN ('upcoming', 'active') AND end_date < %s
+                ORDER BY end_date
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
             )
-            
-            if not created:
-                user_achievement.progress = assigned_tasks_completed
-                user_achievement.save()
-        
-        # Leadership achievements
-        projects_created = user.projects.count()
-        leadership_achievements = Achievement.objects.filter(
-            type='leadership',
-            required_value__lte=projects_created,
-            is_active=True
+            RETURNING id
+            """,
+            [timezone.now(), batch_size],
+            'challenge_expired'
         )
+    
+    @staticmethod
+    def award_badge(achievement, user_ids):
+        """Give a challenge's badge achievement to the users who do not hold it yet
         
-        for achievement in leadership_achievements:
-            user_achievement, created = UserAchievement.objects.get_or_create(
-                user=user,
-                achievement=achievement,
-                defaults={'progress': projects_created}
+        Returns the ids of the users who received it.
+        """
+        if not user_ids:
+            return []
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {UserAchievement._meta.db_table} (user_id, achievement_id, earned_at, progress)
+                SELECT user_id, %s, %s, %s FROM unnest(%s::bigint[]) AS user_id
+                ON CONFLICT (user_id, achievement_id) DO NOTHING
+                RETURNING user_id
+                """,
+                [achievement.pk, timezone.now(), achievement.required_value, list(user_ids)]
             )
-            
-            if not created:
-                user_achievement.progress = projects_created
-                user_achievement.save()
-    
-    @staticmethod
-    def calculate_achievement_progress(user, achievement):
-        if achievement.type == 'task_completion':
-            return user.assigned_tasks.filter(status='completed').count()
-        elif achievement.type == 'streak':
-            return user.current_streak
-        elif achievement.type == 'collaboration':
-            return user.assigned_tasks.filter(
-                status='completed'
-            ).exclude(created_by=user).count()
-        elif achievement.type == 'leadership':
-            return user.projects.count()
-        else:
-            return 0
+            awarded = [row[0] for row in cursor.fetchall()]
+        if not awarded:
+            return []
+        
+        # Raw inserts skip the UserAchievement signals, so counters and rewards are applied here
+        User.objects.filter(pk__in=awarded).update(achievements_count=F('achievements_count') + 1)
+        GamificationService.award_points_bulk(awarded, achievement.points_reward, 'achievement_earned')
+        with ActivityBuffer():
+            for user in User.objects.filter(pk__in=awarded):
+                GamificationService.log_activity(
+                    user=user,
+                    action_type='achievement_earned',
+                    achievement=achievement,
+                    points_earned=achievement.points_reward
+                )
+                WebhookService.send_achievement_notification(user, achievement)
+        return awarded
+
+
+class DashboardService:
+    """Per-user dashboard snapshots, read by primary key and dropped when their inputs change"""
     
     @staticmethod
-    def update_team_challenges(task):
-        """Update team challenge progress when tasks are completed"""
-        if not task.assigned_to:
-            return
+    def build(user):
+        from .serializers import ActivityLogSerializer, UserAchievementSerializer
         
-        user_teams = task.assigned_to.teams.all()
-        active_challenges = TeamChallenge.objects.filter(
-            team__in=user_teams,
-            status='active',
-            start_date__lte=timezone.now(),
-            end_date__gte=timezone.now()
-        )
+        # Recent achievements (last 5)
+        recent_achievements = UserAchievement.objects.filter(
+            user=user
+        ).select_related('achievement', 'achievement__category').order_by('-earned_at')[:5]
         
-        for challenge in active_challenges:
-            if challenge.target_type == 'tasks_completed':
-                challenge.current_progress += 1
-                challenge.save(update_fields=['current_progress'])
-                
-                # Check if challenge is completed
-                if challenge.current_progress >= challenge.target_value:
-                    challenge.status = 'completed'
-                    challenge.save(update_fields=['status'])
-                    
-                    # Award points to all team members
-                    for member in challenge.team.members.all():
-                        GamificationService.update_user_points(
-                            member, 
-                            challenge.points_reward
-                        )
+        # Recent activities (last 10)
+        recent_activities = ActivityLog.objects.filter(
+            user=user
+        ).select_related('task', 'project', 'team', 'achievement').order_by('-timestamp')[:10]
+        
+        return {
+            'teams_joined': TeamMembership.objects.filter(user=user).count(),
+            'recent_achievements': UserAchievementSerializer(recent_achievements, many=True).data,
+            'recent_activities': ActivityLogSerializer(recent_activities, many=True).data
+        }
     
     @staticmethod
-    def get_points_config(config_name, default_value):
-        """Get points configuration value"""
-        try:
-            config = GamificationConfig.objects.get(name=config_name, is_active=True)
-            return config.value
-        except GamificationConfig.DoesNotExist:
-            return default_value
+    def get_snapshot(user):
+        """The user's snapshot, rebuilding it if it was invalidated
+        
+        A rebuild is stored only if no invalidation bumped the version while
+        it was being built; otherwise it is served once and rebuilt next time.
+        """
+        snapshot = DashboardSnapshot.objects.filter(pk=user.pk).first()
+        if snapshot is not None and snapshot.is_current():
+            return snapshot
+        
+        version = snapshot.version if snapshot is not None else 0
+        data = json.loads(json.dumps(DashboardService.build(user), cls=DjangoJSONEncoder))
+        table = DashboardSnapshot._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (user_id, data, version, built_version, created_at)
+                VALUES (%s, %s::jsonb, %s, %s, %s)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    data = EXCLUDED.data,
+                    built_version = EXCLUDED.built_version,
+                    created_at = EXCLUDED.created_at
+                WHERE {table}.version = EXCLUDED.built_version
+                """,
+                [user.pk, json.dumps(data), version, version, timezone.now()]
+            )
+        return DashboardSnapshot(user=user, data=data, version=version, built_version=version)
+    
+    @staticmethod
+    def invalidate(*user_ids):
+        """Mark snapshots stale once the current transaction commits, so a rebuild sees the new rows"""
+        user_ids = [user_id for user_id in user_ids if user_id]
+        if user_ids:
+            transaction.on_commit(lambda: DashboardService.mark_stale(user_ids))
+    
+    @staticmethod
+    def mark_stale(user_ids):
+        """Bump the users' snapshot versions now, creating rows so a rebuild in flight sees it too"""
+        table = DashboardSnapshot._meta.db_table
+        with connection.cursor() as cursor:
+            # Users deleted in the meantime are left out rather than violating the foreign key
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (user_id, data, version, built_version, created_at)
+                SELECT id, '{{}}'::jsonb, 1, NULL, %s FROM {User._meta.db_table} WHERE id = ANY(%s)
+                ON CONFLICT (user_id) DO UPDATE SET version = {table}.version + 1
+                """,
+                [timezone.now(), list(user_ids)]
+            )
 
 
 class WebhookService:
     """Service for handling webhook notifications"""
     
+    DIGEST_MAX_ITEMS = 10  # Discord accepts at most 10 embeds per message
+    
+    # Challenge event -> (title, description verb, color)
+    CHALLENGE_EVENTS = {
+        'challenge_started': ("Challenge Started! 🏁", "has started", 0x3498DB),
+        'challenge_completed': ("Challenge Completed! 🏆", "was completed", 0x10B981),
+        'challenge_expired': ("Challenge Ended ⏰", "ended before reaching its target", 0x95A5A6),
+    }
+    
+    @staticmethod
+    def send_webhook_notification(webhook_config, payload, dispatcher=None):
+        """Send one payload right away, bypassing the outbox"""
+        dispatcher = dispatcher or WebhookDispatcher.shared()
+        result = dispatcher.dispatch(webhook_config.webhook_url, payload)
+        if not result.ok:
+            logger.warning("Webhook %s not delivered: %s", webhook_config.name, result.error)
+        return result.ok
+    
     @staticmethod
-    def send_webhook_notification(webhook_config, payload):
-        try:
-            if webhook_config.platform == 'discord':
-                return WebhookService._send_discord_webhook(webhook_config.webhook_url, payload)
-            elif webhook_config.platform == 'teams':
-                return WebhookService._send_teams_webhook(webhook_config.webhook_url, payload)
-        except Exception as e:
-            print(f"Webhook error: {e}")
-            return False
+    def send_webhook_notifications(deliveries, dispatcher=None):
+        """Send (webhook_config, payload) pairs concurrently; returns DeliveryResults in order"""
+        dispatcher = dispatcher or WebhookDispatcher.shared()
+        return dispatcher.sender.map(
+            lambda delivery: dispatcher.dispatch(delivery[0].webhook_url, delivery[1]),
+            deliveries
+        )
     
     @staticmethod
-    def _send_discord_webhook(webhook_url, payload):
-        """Send Discord webhook"""
-        response = requests.post(webhook_url, json=payload, timeout=10)
-        return response.status_code == 204
+    def queue_webhook_notification(webhook_config, payload, event_type):
+        """Queue a payload in the outbox; the process_webhooks worker delivers it"""
+        return WebhookOutbox.objects.create(
+            webhook=webhook_config,
+            event_type=event_type,
+            payload=payload,
+            available_at=WebhookService._digest_available_at(webhook_config)
+        )
     
     @staticmethod
-    def _send_teams_webhook(webhook_url, payload):
-        """Send Microsoft Teams webhook"""
-        response = requests.post(webhook_url, json=payload, timeout=10)
-        return response.status_code == 200
+    def _digest_available_at(webhook_config):
+        """End of the current digest window, so every event in it is claimed together"""
+        window = webhook_config.digest_window_seconds
+        if not window:
+            return timezone.now()
+        window_end = (int(timezone.now().timestamp()) // window + 1) * window
+        return datetime.fromtimestamp(window_end, tz=dt_timezone.utc)
+    
+    @staticmethod
+    def build_digest_payloads(webhook_config, entries):
+        """Roll up per-event outbox payloads into as few messages as the platform allows
+        
+        Returns (payload, entries) pairs so delivery results can be mapped back.
+        """
+        key = 'embeds' if webhook_config.platform == 'discord' else 'sections'
+        
+        chunks = []
+        items, chunk_entries = [], []
+        for entry in entries:
+            entry_items = entry.payload.get(key, [])
+            if chunk_entries and len(items) + len(entry_items) > WebhookService.DIGEST_MAX_ITEMS:
+                chunks.append((items, chunk_entries))
+                items, chunk_entries = [], []
+            items = items + entry_items
+            chunk_entries.append(entry)
+        if chunk_entries:
+            chunks.append((items, chunk_entries))
+        
+        digests = []
+        for items, chunk_entries in chunks:
+            if len(chunk_entries) == 1:
+                digests.append((chunk_entries[0].payload, chunk_entries))
+            elif webhook_config.platform == 'discord':
+                digests.append(({"embeds": items}, chunk_entries))
+            else:  # Teams
+                first = chunk_entries[0].payload
+                digests.append(({
+                    "@type": "MessageCard",
+                    "@context": "http://schema.org/extensions",
+                    "themeColor": first.get("themeColor", "0076D7"),
+                    "summary": f"{len(chunk_entries)} team updates",
+                    "sections": items
+                }, chunk_entries))
+        return digests
     
     @staticmethod
     def send_task_completion_notification(task):
@@ -299,7 +1218,7 @@ class WebhookService:
                     }]
                 }
             
-            WebhookService.send_webhook_notification(config, payload)
+            WebhookService.queue_webhook_notification(config, payload, 'task_completion')
     
     @staticmethod
     def send_achievement_notification(user, achievement):
@@ -350,7 +1269,72 @@ class WebhookService:
                     }]
                 }
             
-            WebhookService.send_webhook_notification(config, payload)
+            WebhookService.queue_webhook_notification(config, payload, 'achievement')
+    
+    @staticmethod
+    def send_challenge_notifications(challenges, event_type):
+        """Queue challenge lifecycle notifications for every subscribed webhook in one INSERT"""
+        challenges = list(challenges)
+        configs = {}
+        for config in WebhookConfig.objects.filter(
+            team_id__in={challenge.team_id for challenge in challenges},
+            notify_team_challenges=True,
+            is_active=True
+        ):
+            configs.setdefault(config.team_id, []).append(config)
+        if not configs:
+            return 0
+        
+        title, verb, color = WebhookService.CHALLENGE_EVENTS[event_type]
+        entries = []
+        for challenge in challenges:
+            progress = f"{challenge.get_total_progress()}/{challenge.target_value}"
+            for config in configs.get(challenge.team_id, []):
+                if config.platform == 'discord':
+                    payload = {
+                        "embeds": [{
+                            "title": title,
+                            "description": f"**{challenge.team.name}**: **{challenge.name}** {verb}",
+                            "color": color,
+                            "fields": [
+                                {
+                                    "name": challenge.get_target_type_display(),
+                                    "value": progress,
+                                    "inline": True
+                                },
+                                {
+                                    "name": "Reward",
+                                    "value": f"+{challenge.points_reward}",
+                                    "inline": True
+                                }
+                            ],
+                            "timestamp": timezone.now().isoformat()
+                        }]
+                    }
+                else:  # Teams
+                    payload = {
+                        "@type": "MessageCard",
+                        "@context": "http://schema.org/extensions",
+                        "themeColor": f"{color:06X}",
+                        "summary": title,
+                        "sections": [{
+                            "activityTitle": title,
+                            "activitySubtitle": f"{challenge.team.name}: {challenge.name} {verb}",
+                            "facts": [
+                                {"name": challenge.get_target_type_display(), "value": progress},
+                                {"name": "Reward", "value": f"+{challenge.points_reward}"}
+                            ]
+                        }]
+                    }
+                
+                entries.append(WebhookOutbox(
+                    webhook=config,
+                    event_type=event_type,
+                    payload=payload,
+                    available_at=WebhookService._digest_available_at(config)
+                ))
+        WebhookOutbox.objects.bulk_create(entries)
+        return len(entries)
     
     @staticmethod
     def send_team_join_notification(team, user):
@@ -382,4 +1366,166 @@ class WebhookService:
                     }]
                 }
             
-            WebhookService.send_webhook_notification(config, payload)
+            WebhookService.queue_webhook_notification(config, payload, 'team_join')
+
+
+class WebhookOutboxService:
+    """Delivers queued webhook payloads outside of the request cycle"""
+    
+    MAX_ATTEMPTS = 5
+    MAX_DEFERRALS = 100  # Rows held back this often are dead-lettered instead of requeued forever
+    RETRY_DELAY_SECONDS = 30  # Doubled after every failed attempt, with jitter
+    MAX_RETRY_DELAY_SECONDS = 3600
+    LEASE_SECONDS = 300  # Claimed rows older than this are assumed abandoned
+    
+    @staticmethod
+    def claim_batch(batch_size=50):
+        """Claim pending outbox rows, skipping rows locked by other workers"""
+        now = timezone.now()
+        stale_before = now - timezone.timedelta(seconds=WebhookOutboxService.LEASE_SECONDS)
+        
+        with transaction.atomic():
+            entries = list(
+                WebhookOutbox.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(
+                    Q(status='pending', available_at__lte=now) |
+                    Q(status='in_progress', locked_at__lt=stale_before),
+                    webhook__is_active=True
+                )
+                .select_related('webhook')
+                .order_by('id')[:batch_size]
+            )
+            if entries:
+                WebhookOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+                    status='in_progress',
+                    locked_at=now
+                )
+        
+        return entries
+    
+    @staticmethod
+    def retry_delay(attempts, retry_after=None):
+        """Jittered exponential backoff, never shorter than what the endpoint asked for"""
+        delay = min(
+            WebhookOutboxService.MAX_RETRY_DELAY_SECONDS,
+            WebhookOutboxService.RETRY_DELAY_SECONDS * 2 ** (attempts - 1)
+        )
+        delay = random.uniform(delay / 2, delay)
+        return max(delay, retry_after or 0)
+    
+    @staticmethod
+    def deliver_batch(entries, dispatcher=None):
+        """Send claimed rows in parallel and record the outcome of each"""
+        if not entries:
+            return 0, 0
+        
+        # Digest webhooks get one message per chunk of buffered events
+        deliveries = []
+        digest_entries = {}
+        for entry in entries:
+            if entry.webhook.digest_window_seconds:
+                digest_entries.setdefault(entry.webhook_id, []).append(entry)
+            else:
+                deliveries.append((entry.webhook, entry.payload, [entry]))
+        for webhook_entries in digest_entries.values():
+            webhook = webhook_entries[0].webhook
+            for payload, chunk in WebhookService.build_digest_payloads(webhook, webhook_entries):
+                deliveries.append((webhook, payload, chunk))
+        
+        results = WebhookService.send_webhook_notifications(
+            [(webhook, payload) for webhook, payload, _ in deliveries],
+            dispatcher=dispatcher
+        )
+        
+        now = timezone.now()
+        delivered_ids, dead_ids, dead_letters, failed = [], [], [], 0
+        for (_, _, chunk), result in zip(deliveries, results):
+            if result.ok:
+                delivered_ids.extend(entry.id for entry in chunk)
+                continue
+            
+            for entry in chunk:
+                if not result.attempted:
+                    # Held back by a rate limit or open circuit; not a delivery attempt
+                    deferrals = entry.deferrals + 1
+                    if deferrals >= WebhookOutboxService.MAX_DEFERRALS:
+                        dead_ids.append(entry.id)
+                        dead_letters.append(WebhookDeadLetter(
+                            webhook=entry.webhook,
+                            event_type=entry.event_type,
+                            payload=entry.payload,
+                            attempts=entry.attempts,
+                            status_code=result.status_code,
+                            last_error=f'Deferred {deferrals} times: {result.error}'
+                        ))
+                        continue
+                    WebhookOutbox.objects.filter(id=entry.id).update(
+                        status='pending',
+                        deferrals=deferrals,
+                        available_at=now + timezone.timedelta(seconds=result.retry_after or 1),
+                        locked_at=None,
+                        last_error=result.error
+                    )
+                    continue
+                
+                failed += 1
+                attempts = entry.attempts + 1
+                if not result.retryable or attempts >= WebhookOutboxService.MAX_ATTEMPTS:
+                    dead_ids.append(entry.id)
+                    dead_letters.append(WebhookDeadLetter(
+                        webhook=entry.webhook,
+                        event_type=entry.event_type,
+                        payload=entry.payload,
+                        attempts=attempts,
+                        status_code=result.status_code,
+                        last_error=result.error
+                    ))
+                    continue
+                
+                delay = WebhookOutboxService.retry_delay(attempts, result.retry_after)
+                WebhookOutbox.objects.filter(id=entry.id).update(
+                    status='pending',
+                    attempts=attempts,
+                    available_at=now + timezone.timedelta(seconds=delay),
+                    locked_at=None,
+                    last_error=result.error
+                )
+        
+        if delivered_ids:
+            WebhookOutbox.objects.filter(id__in=delivered_ids).update(
+                status='delivered',
+                delivered_at=now,
+                locked_at=None,
+                last_error=''
+            )
+        
+        if dead_letters:
+            # Permanently failed payloads are parked for inspection and replay
+            with transaction.atomic():
+                WebhookDeadLetter.objects.bulk_create(dead_letters)
+                WebhookOutbox.objects.filter(id__in=dead_ids).delete()
+        
+        return len(delivered_ids), failed
+    
+    @staticmethod
+    def replay_dead_letters(dead_letters):
+        """Queue dead-lettered payloads for delivery again"""
+        replayed = 0
+        with transaction.atomic():
+            for dead_letter in dead_letters.filter(replayed_at__isnull=True).select_related('webhook'):
+                WebhookService.queue_webhook_notification(
+                    dead_letter.webhook, dead_letter.payload, dead_letter.event_type
+                )
+                replayed += 1
+            dead_letters.filter(replayed_at__isnull=True).update(replayed_at=timezone.now())
+        return replayed
+    
+    @staticmethod
+    def purge_delivered(older_than_days=7):
+        """Delete delivered rows so the outbox stays small"""
+        cutoff = timezone.now() - timezone.timedelta(days=older_than_days)
+        deleted, _ = WebhookOutbox.objects.filter(
+            status='delivered',
+            delivered_at__lt=cutoff
+        ).delete()
+        return deleted
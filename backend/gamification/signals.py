@@ -1,15 +1,20 @@
 from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import ActivityLog, UserAchievement, Achievement, GamificationConfig
-from .services import GamificationService, WebhookService
-from projects.models import Task
+from .models import ActivityLog, UserAchievement, Achievement, GamificationConfig, TeamMembership, TeamChallenge
+from .services import (
+    AchievementEngine, ChallengeCache, ChallengeEngine, ConfigCache, DashboardService, GamificationService
+)
+from projects.models import Project, Task
 from users.models import User
 
 
 @receiver(post_save, sender=Task)
 def handle_task_save(sender, instance, created, **kwargs):
-    """Handle task creation and completion"""
+    """Handle task creation and real transitions to completed"""
+    counters = GamificationService.sync_task_counters(instance)
+    
     if created:
         # Task created
         GamificationService.log_activity(
@@ -20,81 +25,95 @@ def handle_task_save(sender, instance, created, **kwargs):
             points_earned=GamificationService.get_points_config('task_created', 25)
         )
     
-    elif instance.status == 'completed' and instance.assigned_to:
-        # Task completed
-        points_earned = GamificationService.get_points_config('task_completed', 100)
-        
-        # Bonus points for priority
-        if instance.priority == 'high':
-            points_earned += GamificationService.get_points_config('high_priority_bonus', 50)
-        elif instance.priority == 'medium':
-            points_earned += GamificationService.get_points_config('medium_priority_bonus', 25)
-        
-        GamificationService.log_activity(
-            user=instance.assigned_to,
-            action_type='task_completed',
-            task=instance,
-            project=instance.project,
-            points_earned=points_earned
-        )
-        
-        # Update user points and streak
-        GamificationService.update_user_points(instance.assigned_to, points_earned)
-        GamificationService.update_user_streak(instance.assigned_to)
-        
-        # Check for achievements
-        GamificationService.check_and_award_achievements(instance.assigned_to)
-        
-        # Update team challenges
-        GamificationService.update_team_challenges(instance)
-        
-        # Send webhook notifications
-        WebhookService.send_task_completion_notification(instance)
+    elif instance.became_completed() and instance.assigned_to_id:
+        # Edits to an already completed task reward nothing, and a rolled back
+        # completion never reaches the points, achievement and webhook chain
+        transaction.on_commit(lambda: GamificationService.reward_task_completion(instance, counters))
+
+
+@receiver(post_delete, sender=Task)
+def handle_task_delete(sender, instance, **kwargs):
+    """Uncount deleted completed tasks"""
+    GamificationService.sync_task_counters(instance, deleted=True)
+
+
+@receiver(post_save, sender=Project)
+def handle_project_save(sender, instance, created, **kwargs):
+    """Count created projects, check leadership achievements and credit finished projects"""
+    if created:
+        counters = GamificationService.adjust_user_counters(instance.owner_id, projects_created=1)
+        GamificationService.check_and_award_achievements(instance.owner, {'leadership': 1}, counters)
+    elif instance.loaded_value('is_active') and not instance.is_active:
+        # Projects have no status; closing an active project is what finishes it
+        ChallengeEngine.project_finished(instance)
+
+
+@receiver(post_delete, sender=Project)
+def handle_project_delete(sender, instance, **kwargs):
+    GamificationService.adjust_user_counters(instance.owner_id, projects_created=-1)
+
+
+@receiver(post_save, sender=TeamMembership)
+def handle_membership_save(sender, instance, created, **kwargs):
+    if created:
+        GamificationService.adjust_team_membership(instance, joined=True)
+
+
+@receiver(post_delete, sender=TeamMembership)
+def handle_membership_delete(sender, instance, **kwargs):
+    GamificationService.adjust_team_membership(instance, joined=False)
+
+
+@receiver(post_save, sender=TeamChallenge)
+@receiver(post_delete, sender=TeamChallenge)
+def handle_challenge_change(sender, instance, update_fields=None, **kwargs):
+    """Keep the team's completed challenge count and cached challenge ids current"""
+    if update_fields is None or 'status' in update_fields:
+        GamificationService.refresh_completed_challenges(instance.team_id)
+    transaction.on_commit(lambda: ChallengeCache.invalidate(instance.team_id))
+
+
+@receiver(post_delete, sender=UserAchievement)
+def handle_achievement_revoked(sender, instance, **kwargs):
+    GamificationService.adjust_user_counters(instance.user_id, achievements_count=-1)
+    DashboardService.invalidate(instance.user_id)
 
 
 @receiver(post_save, sender=UserAchievement)
 def handle_achievement_earned(sender, instance, created, **kwargs):
     """Handle achievement earned"""
+    if created:
+        GamificationService.adjust_user_counters(instance.user_id, achievements_count=1)
+        DashboardService.invalidate(instance.user_id)
+    
     if created and instance.progress >= instance.achievement.required_value:
-        # Award points for achievement
-        GamificationService.update_user_points(
-            instance.user, 
-            instance.achievement.points_reward
-        )
-        
-        # Log activity
-        GamificationService.log_activity(
-            user=instance.user,
-            action_type='achievement_earned',
-            achievement=instance.achievement,
-            points_earned=instance.achievement.points_reward
-        )
-        
-        # Send webhook notifications
-        WebhookService.send_achievement_notification(instance.user, instance.achievement)
+        # Achievements created by AchievementEngine are bulk inserted and rewarded there
+        GamificationService.reward_achievement(instance.user, instance.achievement)
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def handle_achievement_change(sender, **kwargs):
+    """Rebuild the achievement threshold index after edits"""
+    AchievementEngine.invalidate()
+
+
+@receiver(post_save, sender=GamificationConfig)
+@receiver(post_delete, sender=GamificationConfig)
+def handle_config_change(sender, **kwargs):
+    """Reload point values on the next lookup"""
+    ConfigCache.invalidate()
 
 
 @receiver(post_save, sender=User)
-def handle_user_streak_update(sender, instance, **kwargs):
-    """Handle streak maintenance"""
-    if instance.current_streak > 0:
-        # Check for streak achievements
-        streak_achievements = Achievement.objects.filter(
-            type='streak',
-            required_value__lte=instance.current_streak,
-            is_active=True
-        )
-        
-        for achievement in streak_achievements:
-            user_achievement, created = UserAchievement.objects.get_or_create(
-                user=instance,
-                achievement=achievement,
-                defaults={'progress': instance.current_streak}
-            )
-            
-            if not created:
-                user_achievement.progress = instance.current_streak
-                user_achievement.save()
+def handle_user_streak_update(sender, instance, update_fields=None, **kwargs):
+    """Award streak achievements when a save raises current_streak"""
+    if update_fields is not None and 'current_streak' not in update_fields:
+        return
+    
+    previous_streak = instance.loaded_value('current_streak', 0)
+    if instance.current_streak > previous_streak:
+        AchievementEngine.award(instance, {'streak': instance.current_streak}, {'streak': previous_streak})
 
 
 def initialize_default_achievements():
@@ -0,0 +1,786 @@
+import gzip
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from projects.models import Project, Task
+from users.models import User
+from gamification.models import (
+    ActivityLog, Achievement, Category, ChallengeProgressShard, DailyPointsRollup, DashboardSnapshot, PointsTransaction, Team, TeamChallenge, UserAchievement,
+    TeamMembership, WebhookConfig, WebhookDeadLetter, WebhookOutbox
+)
+from gamification.leaderboard import PointsHistogram, decode_cursor, encode_cursor, rollup_leaderboard
+from gamification.services import AchievementEngine, ActivityBuffer, ChallengeEngine, DashboardService, GamificationService, WebhookOutboxService
+from gamification.webhooks import CircuitBreaker, DeliveryResult, TokenBucket, WebhookDispatcher, WebhookSender
+
+
+class PointsHistogramTests(SimpleTestCase):
+    def test_ranks_count_strictly_greater_values(self):
+        histogram = PointsHistogram()
+        for points in (50, 100, 100, 300):
+            histogram.add(points)
+        self.assertEqual(
+            [histogram.count_greater(points) for points in (0, 50, 100, 299, 300)],
+            [4, 3, 1, 1, 0]
+        )
+
+    def test_growth_keeps_counts(self):
+        histogram = PointsHistogram(capacity=4)
+        histogram.add(3)
+        histogram.add(1000)
+        self.assertEqual(histogram.capacity, 1024)
+        self.assertEqual((histogram.count_greater(2), histogram.count_greater(3)), (2, 1))
+
+    def test_removal(self):
+        histogram = PointsHistogram()
+        histogram.add(10, 2)
+        histogram.add(10, -1)
+        histogram.add(20)
+        self.assertEqual((histogram.total, histogram.count_greater(0), histogram.count_at_most(10)), (2, 2, 1))
+
+    def test_outliers_do_not_grow_the_tree(self):
+        histogram = PointsHistogram(capacity=4, max_capacity=16)
+        for points in (5, 10 ** 9, 10 ** 9, 20):
+            histogram.add(points)
+        self.assertLessEqual(histogram.capacity, 16)
+        self.assertEqual(
+            [histogram.count_greater(points) for points in (4, 15, 20, 10 ** 9)],
+            [4, 3, 2, 0]
+        )
+        histogram.add(10 ** 9, -1)
+        self.assertEqual((histogram.count_greater(20), histogram.total), (1, 3))
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(120, 7, 3), 3), [120, 7, 3])
+
+    def test_rejects_malformed_cursors(self):
+        for cursor in ('not base64!', encode_cursor('a', 1), encode_cursor(1, 2)):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor, 3)
+
+
+class FakeClock:
+    """Stands in for time.monotonic in gamification.webhooks"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class StubWebhookServer:
+    """Local HTTP endpoint answering each POST with the next queued (status, headers)"""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests.append(json.loads(body or b'null'))
+                status, headers = stub.responses.pop(0) if stub.responses else (204, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('gamification.webhooks.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=2, capacity=3)
+        self.assertEqual([bucket.reserve(0) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertEqual(bucket.reserve(1), 0.5)
+
+    def test_refuses_waits_longer_than_max_wait(self):
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket.reserve(0)
+        self.assertIsNone(bucket.reserve(0.5))
+        self.assertEqual(bucket.tokens, 0)  # A refused reservation takes nothing
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=2)
+        bucket.reserve(0)
+        bucket.reserve(0)
+        self.clock.now += 10
+        self.assertEqual(bucket.reserve(0), 0.0)
+        self.assertEqual(bucket.tokens, 1)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('gamification.webhooks.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.circuit = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def open_circuit(self):
+        self.circuit.record_failure()
+        self.circuit.record_failure()
+
+    def test_opens_after_threshold(self):
+        self.circuit.record_failure()
+        self.assertEqual(self.circuit.retry_after(), 0)
+        self.circuit.record_failure()
+        self.assertEqual(self.circuit.retry_after(), 30)
+
+    def test_lets_a_single_probe_through_after_timeout(self):
+        self.open_circuit()
+        self.clock.now += 31
+        self.assertEqual(self.circuit.retry_after(), 0)
+        self.assertGreater(self.circuit.retry_after(), 0)
+
+    def test_successful_probe_closes(self):
+        self.open_circuit()
+        self.clock.now += 31
+        self.circuit.retry_after()
+        self.circuit.record_success()
+        self.assertEqual(self.circuit.retry_after(), 0)
+        self.assertEqual(self.circuit.retry_after(), 0)
+
+    def test_failed_probe_reopens(self):
+        self.open_circuit()
+        self.clock.now += 31
+        self.circuit.retry_after()
+        self.circuit.record_failure()
+        self.assertEqual(self.circuit.retry_after(), 30)
+
+    def test_released_probe_can_be_retried(self):
+        self.open_circuit()
+        self.clock.now += 31
+        self.circuit.retry_after()
+        self.circuit.release_probe()
+        self.assertEqual(self.circuit.retry_after(), 0)
+
+
+class WebhookDispatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.server = StubWebhookServer().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.sender = WebhookSender(max_workers=2, per_host_concurrency=2, timeout=5)
+        self.addCleanup(self.sender._executor.shutdown)
+        self.dispatcher = WebhookDispatcher(sender=self.sender, rate=100, burst=100)
+
+    def circuit(self):
+        return self.dispatcher._endpoint(self.server.url)['circuit']
+
+    def open_circuit(self):
+        circuit = self.circuit()
+        for _ in range(WebhookDispatcher.FAILURE_THRESHOLD):
+            circuit.record_failure()
+        circuit.opened_at -= WebhookDispatcher.RESET_TIMEOUT + 1  # Due for a probe
+
+    def test_delivers(self):
+        result = self.dispatcher.dispatch(self.server.url, {'content': 'hi'})
+        self.assertTrue(result.ok)
+        self.assertEqual(self.server.requests, [{'content': 'hi'}])
+
+    def test_server_errors_are_retryable_and_open_the_circuit(self):
+        self.server.responses = [(500, {})] * WebhookDispatcher.FAILURE_THRESHOLD
+        for _ in range(WebhookDispatcher.FAILURE_THRESHOLD):
+            result = self.dispatcher.dispatch(self.server.url, {})
+            self.assertTrue(result.retryable)
+            self.assertTrue(result.attempted)
+
+        result = self.dispatcher.dispatch(self.server.url, {})
+        self.assertFalse(result.attempted)
+        self.assertEqual(result.error, 'Circuit open')
+        self.assertEqual(len(self.server.requests), WebhookDispatcher.FAILURE_THRESHOLD)
+
+    def test_client_errors_are_not_retryable(self):
+        self.server.responses = [(404, {})]
+        result = self.dispatcher.dispatch(self.server.url, {})
+        self.assertFalse(result.ok)
+        self.assertFalse(result.retryable)
+
+    def test_429_is_deferred_not_attempted(self):
+        self.server.responses = [(429, {'Retry-After': '0.5'})]
+        result = self.dispatcher.dispatch(self.server.url, {})
+        self.assertFalse(result.attempted)
+        self.assertEqual(result.retry_after, 0.5)
+        self.assertEqual(self.circuit().failures, 0)
+
+    def test_429_on_probe_releases_it(self):
+        self.open_circuit()
+        self.server.responses = [(429, {'Retry-After': '0'})]
+        self.assertEqual(self.dispatcher.dispatch(self.server.url, {}).status_code, 429)
+
+        result = self.dispatcher.dispatch(self.server.url, {})
+        self.assertTrue(result.ok)
+        self.assertIsNone(self.circuit().opened_at)
+
+    def test_rate_limited_probe_is_released(self):
+        self.open_circuit()
+        self.dispatcher._endpoint(self.server.url)['blocked_until'] = float('inf')
+        result = self.dispatcher.dispatch(self.server.url, {})
+        self.assertEqual(result.error, 'Rate limited')
+        self.assertFalse(self.circuit().probing)
+
+        self.dispatcher._endpoint(self.server.url)['blocked_until'] = 0.0
+        self.assertTrue(self.dispatcher.dispatch(self.server.url, {}).ok)
+
+
+class DeferredDispatcher:
+    """Dispatcher whose every delivery is held back without an attempt"""
+
+    def __init__(self):
+        self.sender = WebhookSender(max_workers=1, per_host_concurrency=1)
+
+    def dispatch(self, webhook_url, payload):
+        return DeliveryResult(ok=False, attempted=False, retry_after=1, error='Circuit open')
+
+
+class WebhookOutboxDeferralTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='admin', email='admin@example.com')
+        team = Team.objects.create(
+            name='Team', category=Category.objects.create(name='software', display_name='Software'),
+            administrator=user
+        )
+        self.webhook = WebhookConfig.objects.create(
+            name='Hook', platform='discord', webhook_url='http://127.0.0.1:9/hook', team=team
+        )
+        self.dispatcher = DeferredDispatcher()
+        self.addCleanup(self.dispatcher.sender._executor.shutdown)
+
+    def test_deferral_requeues_without_counting_an_attempt(self):
+        entry = WebhookOutbox.objects.create(webhook=self.webhook, event_type='test', payload={})
+        WebhookOutboxService.deliver_batch([entry], self.dispatcher)
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts, entry.deferrals), ('pending', 0, 1))
+
+    def test_repeatedly_deferred_rows_are_dead_lettered(self):
+        entry = WebhookOutbox.objects.create(
+            webhook=self.webhook, event_type='test', payload={},
+            deferrals=WebhookOutboxService.MAX_DEFERRALS - 1
+        )
+        WebhookOutboxService.deliver_batch([entry], self.dispatcher)
+        self.assertFalse(WebhookOutbox.objects.filter(pk=entry.pk).exists())
+        self.assertTrue(WebhookDeadLetter.objects.get().last_error.startswith('Deferred'))
+
+
+class CounterThresholdTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='dev', email='dev@example.com')
+        self.achievement = Achievement.objects.create(
+            name='Five Tasks', description='Complete 5 tasks', type='task_completion', required_value=5
+        )
+
+    def test_adjust_returns_counters_after_the_update(self):
+        GamificationService.adjust_user_counters(self.user.pk, tasks_completed=3)
+        counters = GamificationService.adjust_user_counters(self.user.pk, tasks_completed=1, projects_created=0)
+        self.assertEqual(counters, {'tasks_completed': 4})
+
+    def test_threshold_crossed_by_this_move_is_awarded_despite_later_moves(self):
+        GamificationService.adjust_user_counters(self.user.pk, tasks_completed=4)
+        counters = GamificationService.adjust_user_counters(self.user.pk, tasks_completed=1)
+        GamificationService.adjust_user_counters(self.user.pk, tasks_completed=1)  # Lands before the check
+
+        GamificationService.check_and_award_achievements(self.user, {'task_completion': 1}, counters)
+        self.assertTrue(UserAchievement.objects.filter(user=self.user, achievement=self.achievement).exists())
+
+
+class ChallengeCompletionTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='admin', email='admin@example.com')
+        self.team = Team.objects.create(
+            name='Team', category=Category.objects.create(name='software', display_name='Software'),
+            administrator=user
+        )
+        WebhookConfig.objects.create(
+            name='Hook', platform='discord', webhook_url='http://127.0.0.1:9/hook', team=self.team
+        )
+        now = timezone.now()
+        self.challenge = TeamChallenge.objects.create(
+            name='Ship it', description='Complete 5 tasks', team=self.team, target_type='tasks_completed',
+            target_value=5, start_date=now - timezone.timedelta(days=1), end_date=now + timezone.timedelta(days=1),
+            status='active', created_by=user, progress_shards=4
+        )
+
+    def test_completes_once_on_shard_inclusive_progress(self):
+        TeamChallenge.objects.filter(pk=self.challenge.pk).update(current_progress=2)
+        ChallengeProgressShard.objects.create(challenge=self.challenge, shard=0, amount=1)
+        self.assertIsNone(ChallengeEngine.complete(self.challenge.pk))
+
+        ChallengeProgressShard.objects.create(challenge=self.challenge, shard=1, amount=2)
+        self.assertIsNotNone(ChallengeEngine.complete(self.challenge.pk))
+        self.assertIsNone(ChallengeEngine.complete(self.challenge.pk))
+
+    def test_notification_reports_shard_inclusive_progress(self):
+        ChallengeProgressShard.objects.create(challenge=self.challenge, shard=0, amount=5)
+        ChallengeEngine.complete(self.challenge.pk)
+        fields = WebhookOutbox.objects.get().payload['embeds'][0]['fields']
+        self.assertEqual(fields[0]['value'], '5/5')
+
+
+class TaskRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='dev', email='dev@example.com')
+        self.project = Project.objects.create(name='Project', description='', owner=self.user)
+
+    def complete(self, **fields):
+        return Task.objects.create(
+            name='Task', description='', status='completed', priority='low', project=self.project,
+            created_by=self.user, assigned_to=self.user, **fields
+        )
+
+    def rollups(self):
+        return dict(DailyPointsRollup.objects.filter(user=self.user).values_list('day', 'tasks_completed'))
+
+    def test_reopen_is_debited_on_the_completion_day(self):
+        completed_at = timezone.now() - timezone.timedelta(days=3)
+        task = self.complete(completed_at=completed_at)
+        task.status = 'in_progress'
+        task.save()
+        self.assertEqual(self.rollups(), {
+            timezone.localdate(): 1, timezone.localdate(completed_at): -1
+        })
+
+    def test_deleting_a_task_leaves_rollups_alone(self):
+        self.complete().delete()
+        self.assertEqual(self.rollups(), {timezone.localdate(): 1})
+
+    def test_deleting_a_user_with_a_completed_task(self):
+        self.complete()
+        self.user.delete()
+        connection.check_constraints()  # Deferred foreign keys are only checked at commit otherwise
+        self.assertFalse(DailyPointsRollup.objects.exists())
+
+
+class TaskTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='dev', email='dev@example.com')
+        self.project = Project.objects.create(name='Project', description='', owner=self.user)
+        self.task = Task.objects.create(
+            name='Task', description='', status='todo', priority='low', project=self.project,
+            created_by=self.user, assigned_to=self.user
+        )
+
+    def save_status(self, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.status = status
+            self.task.save()
+
+    def rewards(self):
+        self.user.refresh_from_db()
+        return (
+            self.user.tasks_completed,
+            PointsTransaction.objects.filter(user=self.user, reason='task_completed').count(),
+            ActivityLog.objects.filter(user=self.user, action_type='task_completed').count()
+        )
+
+    def test_resaving_a_completed_task_rewards_once(self):
+        self.save_status('completed')
+        self.task.name = 'Renamed'
+        self.save_status('completed')
+        self.assertEqual(self.rewards(), (1, 1, 1))
+
+    def test_reopen_then_complete_counts_again(self):
+        self.save_status('completed')
+        self.save_status('in_progress')
+        self.assertEqual(self.rewards()[0], 0)
+        self.save_status('completed')
+        self.assertEqual(self.rewards(), (1, 2, 2))
+
+    def test_rolled_back_completion_rewards_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.task.status = 'completed'
+                self.task.save()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.rewards(), (0, 0, 0))
+
+    def test_stale_instance_does_not_complete_twice(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        self.save_status('completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.status = 'completed'
+            stale.save()
+        self.assertEqual(self.rewards(), (1, 1, 1))
+
+
+class ConcurrentCompletionTests(TransactionTestCase):
+    def test_concurrent_complete_task_pays_once(self):
+        user = User.objects.create(username='dev', email='dev@example.com')
+        project = Project.objects.create(name='Project', description='', owner=user)
+        task = Task.objects.create(
+            name='Task', description='', status='todo', priority='low', project=project,
+            created_by=user, assigned_to=user
+        )
+        barrier = threading.Barrier(2)
+        results = []
+
+        def complete():
+            try:
+                instance = Task.objects.select_related('assigned_to').get(pk=task.pk)
+                barrier.wait()
+                results.append(instance.complete_task())
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=complete) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        user.refresh_from_db()
+        self.assertEqual(sorted(results), [False, True])
+        self.assertEqual(user.tasks_completed, 1)
+        self.assertEqual(PointsTransaction.objects.filter(user=user, reason='task_completed').count(), 1)
+
+
+class TeamPointsContentionTests(TransactionTestCase):
+    def test_members_do_not_wait_on_each_others_open_transactions(self):
+        first = User.objects.create(username='first', email='first@example.com')
+        second = User.objects.create(username='second', email='second@example.com')
+        team = Team.objects.create(
+            name='Team', category=Category.objects.create(name='software', display_name='Software'),
+            administrator=first
+        )
+        for user in (first, second):
+            TeamMembership.objects.create(user=user, team=team)
+        credited, release = threading.Event(), threading.Event()
+
+        def hold_open_transaction():
+            try:
+                with transaction.atomic():
+                    GamificationService.update_user_points(first, 10)
+                    credited.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=hold_open_transaction)
+        thread.start()
+        try:
+            credited.wait(5)
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '1s'")
+                GamificationService.update_user_points(second, 5)
+        finally:
+            release.set()
+            thread.join()
+
+        team.refresh_from_db()
+        self.assertEqual(team.total_points, 15)
+
+
+class RestoreActivityTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='dev', email='dev@example.com')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive = Path(directory.name) / 'activity.jsonl.gz'
+        with gzip.open(self.archive, 'wt', encoding='utf-8') as archive:
+            for log_id in (901, 902):
+                archive.write(json.dumps({
+                    'id': log_id, 'user_id': user.pk, 'action_type': 'task_completed', 'points_earned': 100,
+                    'task_id': None, 'project_id': None, 'team_id': None, 'achievement_id': None,
+                    'metadata': {}, 'timestamp': timezone.now().isoformat()
+                }) + '\n')
+
+    def restore(self):
+        out = StringIO()
+        call_command('restore_activity', str(self.archive), stdout=out)
+        return out.getvalue()
+
+    def test_second_restore_reports_nothing_inserted(self):
+        self.assertIn('Restored 2 activity rows, left 0 already present', self.restore())
+        self.assertIn('Restored 0 activity rows, left 2 already present', self.restore())
+        self.assertEqual(ActivityLog.objects.filter(id__in=[901, 902]).count(), 2)
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='dev', email='dev@example.com')
+
+    def test_snapshot_is_reused_until_invalidated(self):
+        DashboardService.get_snapshot(self.user)
+        self.assertTrue(DashboardSnapshot.objects.get(pk=self.user.pk).is_current())
+        with self.captureOnCommitCallbacks(execute=True):
+            DashboardService.invalidate(self.user.pk)
+        self.assertFalse(DashboardSnapshot.objects.get(pk=self.user.pk).is_current())
+
+    def test_invalidation_during_a_rebuild_is_not_lost(self):
+        build = DashboardService.build
+
+        def build_then_invalidate(user):
+            data = build(user)
+            DashboardService.mark_stale([user.pk])  # An activity commits while the snapshot is built
+            return data
+
+        with mock.patch.object(DashboardService, 'build', build_then_invalidate):
+            DashboardService.get_snapshot(self.user)
+        self.assertFalse(DashboardSnapshot.objects.get(pk=self.user.pk).is_current())
+
+        DashboardService.get_snapshot(self.user)
+        self.assertTrue(DashboardSnapshot.objects.get(pk=self.user.pk).is_current())
+
+    def test_invalidating_a_deleted_user(self):
+        user_id = self.user.pk
+        self.user.delete()
+        DashboardService.mark_stale([user_id])
+        self.assertFalse(DashboardSnapshot.objects.exists())
+
+
+class UserCounterTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username='lead', email='lead@example.com')
+        self.assignee = User.objects.create(username='dev', email='dev@example.com')
+        self.project = Project.objects.create(name='Project', description='', owner=self.creator)
+        self.task = Task.objects.create(
+            name='Task', description='', status='todo', priority='low', project=self.project,
+            created_by=self.creator, assigned_to=self.assignee
+        )
+
+    def counters(self, user):
+        user.refresh_from_db()
+        return user.tasks_completed, user.collaboration_completed
+
+    def save_status(self, status):
+        self.task.status = status
+        self.task.save()
+
+    def test_complete_and_reopen(self):
+        self.save_status('completed')
+        self.assertEqual(self.counters(self.assignee), (1, 1))
+        self.save_status('in_progress')
+        self.assertEqual(self.counters(self.assignee), (0, 0))
+
+    def test_own_tasks_are_not_collaboration(self):
+        self.task.assigned_to = self.creator
+        self.save_status('completed')
+        self.assertEqual(self.counters(self.creator), (1, 0))
+
+    def test_reassigning_a_completed_task_moves_the_count(self):
+        self.save_status('completed')
+        self.task.assigned_to = self.creator
+        self.task.save()
+        self.assertEqual((self.counters(self.assignee), self.counters(self.creator)), ((0, 0), (1, 0)))
+
+    def test_delete_uncounts(self):
+        self.save_status('completed')
+        self.task.delete()
+        self.assertEqual(self.counters(self.assignee), (0, 0))
+
+    def test_projects_and_achievements(self):
+        self.creator.refresh_from_db()
+        self.assertEqual(self.creator.projects_created, 1)
+        Project.objects.create(name='Second', description='', owner=self.creator).delete()
+        self.creator.refresh_from_db()
+        self.assertEqual(self.creator.projects_created, 1)
+
+        achievement = Achievement.objects.create(
+            name='Hidden', description='', type='task_completion', required_value=99, points_reward=0
+        )
+        earned = UserAchievement.objects.create(user=self.creator, achievement=achievement)
+        self.creator.refresh_from_db()
+        self.assertEqual(self.creator.achievements_count, 1)
+        earned.delete()
+        self.creator.refresh_from_db()
+        self.assertEqual(self.creator.achievements_count, 0)
+
+
+class PointsRollupTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='software', display_name='Software')
+        self.users = [User.objects.create(username=f'dev{n}', email=f'dev{n}@example.com') for n in range(2)]
+
+    def rollup(self, user, category=None):
+        return DailyPointsRollup.objects.filter(user=user, day=timezone.localdate(), category=category).values_list(
+            'points', 'tasks_completed'
+        ).first()
+
+    def test_points_are_ledgered_and_rolled_up_per_category(self):
+        user = self.users[0]
+        GamificationService.update_user_points(user, 100, 'task_completed', category_id=self.category.pk)
+        GamificationService.update_user_points(user, 30, 'task_completed', category_id=self.category.pk)
+        GamificationService.update_user_points(user, -10)
+        self.assertEqual(
+            list(PointsTransaction.objects.filter(user=user).order_by('id').values_list('amount', 'balance_after')),
+            [(100, 100), (30, 130), (-10, 120)]
+        )
+        self.assertEqual((self.rollup(user, self.category), self.rollup(user)), ((130, 0), (-10, 0)))
+
+    def test_bulk_awards_roll_up_every_user(self):
+        GamificationService.award_points_bulk([user.pk for user in self.users], 50, 'challenge_completed')
+        self.assertEqual([self.rollup(user) for user in self.users], [(50, 0), (50, 0)])
+
+    def test_completed_tasks_roll_up_under_the_project_category(self):
+        project = Project.objects.create(name='Project', description='', owner=self.users[0], category=self.category)
+        Task.objects.create(
+            name='Task', description='', status='completed', priority='low', project=project,
+            created_by=self.users[0], assigned_to=self.users[1]
+        )
+        self.assertEqual(self.rollup(self.users[1], self.category), (0, 1))
+
+    def test_window_leaderboard(self):
+        GamificationService.update_user_points(self.users[0], 40)
+        GamificationService.update_user_points(self.users[1], 90, category_id=self.category.pk)
+        today = timezone.localdate()
+        self.assertEqual(
+            [(row['username'], row['points'], row['rank']) for row in rollup_leaderboard(today, today)],
+            [('dev1', 90, 1), ('dev0', 40, 2)]
+        )
+        self.assertEqual(len(rollup_leaderboard(today, today, category_id=self.category.pk)), 1)
+
+
+class TeamAggregateTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@example.com')
+        self.member = User.objects.create(username='dev', email='dev@example.com', points=40)
+        self.team = Team.objects.create(
+            name='Team', category=Category.objects.create(name='software', display_name='Software'),
+            administrator=self.admin
+        )
+
+    def totals(self):
+        self.team.refresh_from_db()
+        return self.team.member_count, self.team.total_points
+
+    def test_join_and_leave_move_members_and_their_points(self):
+        membership = TeamMembership.objects.create(user=self.member, team=self.team)
+        self.assertEqual(self.totals(), (1, 40))
+        membership.delete()
+        self.assertEqual(self.totals(), (0, 0))
+
+    def test_awards_reach_the_team_after_commit(self):
+        TeamMembership.objects.create(user=self.member, team=self.team)
+        with self.captureOnCommitCallbacks(execute=True):
+            GamificationService.update_user_points(self.member, 25)
+            GamificationService.award_points_bulk([self.member.pk, self.admin.pk], 10, 'challenge_completed')
+            self.assertEqual(self.totals(), (1, 40))
+        self.assertEqual(self.totals(), (1, 75))
+        self.assertEqual(TeamMembership.objects.get(user=self.member).points_contributed, 35)
+
+    def test_completed_challenges(self):
+        now = timezone.now()
+        challenge = TeamChallenge.objects.create(
+            name='Ship it', description='', team=self.team, target_type='tasks_completed', target_value=1,
+            start_date=now, end_date=now + timezone.timedelta(days=1), status='active', created_by=self.admin
+        )
+        challenge.status = 'completed'
+        challenge.save()
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.completed_challenges, 1)
+        challenge.delete()
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.completed_challenges, 0)
+
+
+class ActivityBufferTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='dev', email='dev@example.com')
+
+    def log(self, action_type):
+        GamificationService.log_activity(user=self.user, action_type=action_type)
+
+    def logged(self):
+        return sorted(ActivityLog.objects.filter(user=self.user).values_list('action_type', flat=True))
+
+    def test_transaction_entries_are_written_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log('task_created')
+            self.assertEqual(self.logged(), [])
+        self.assertEqual(self.logged(), ['task_created'])
+
+    def test_rolled_back_savepoint_discards_its_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log('task_created')
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.log('team_joined')
+                raise RuntimeError
+            with transaction.atomic():
+                self.log('task_completed')
+        self.assertEqual(self.logged(), ['task_completed', 'task_created'])
+
+    def test_block_flushes_in_one_insert(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with ActivityBuffer():
+                for action_type in ('task_created', 'task_completed', 'achievement_earned'):
+                    self.log(action_type)
+        with self.assertNumQueries(2):  # The INSERT and marking the dashboard stale
+            for callback in callbacks:
+                callback()
+        self.assertEqual(len(self.logged()), 3)
+
+    def test_block_left_by_an_exception_discards_its_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), ActivityBuffer():
+                self.log('task_created')
+                raise RuntimeError
+        self.assertEqual(self.logged(), [])
+
+
+class StreakAchievementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='dev', email='dev@example.com')
+        self.achievement = Achievement.objects.create(
+            name='Consistent', description='3 day streak', type='streak', required_value=3, points_reward=0
+        )
+
+    def earned(self):
+        return UserAchievement.objects.filter(user=self.user, achievement=self.achievement).exists()
+
+    def test_save_without_current_streak_checks_nothing(self):
+        self.user.current_streak = 5
+        with mock.patch.object(AchievementEngine, 'award') as award:
+            self.user.save(update_fields=['points'])
+        award.assert_not_called()
+        self.assertFalse(self.earned())
+
+    def test_raising_current_streak_past_the_threshold_awards(self):
+        self.user.current_streak = 2
+        self.user.save(update_fields=['current_streak'])
+        self.assertFalse(self.earned())
+        self.user.current_streak = 3
+        self.user.save(update_fields=['current_streak', 'last_activity_date'])
+        self.assertTrue(self.earned())
+
+    def test_unchanged_or_lower_streak_checks_nothing(self):
+        self.user.current_streak = 4
+        self.user.save()
+        with mock.patch.object(AchievementEngine, 'award') as award:
+            self.user.save()
+            self.user.current_streak = 1
+            self.user.save(update_fields=['current_streak'])
+        award.assert_not_called()
@@ -1,10 +1,16 @@
+import hashlib
+import json
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
 from django.db import transaction, models
 from django.utils import timezone
-from django.db.models import Count, Sum, Q
+from django.utils.dateparse import parse_date
+from django.db.models import Sum, Q, Prefetch
 from .models import (
     Category, Team, TeamMembership, Achievement, UserAchievement,
     TeamChallenge, ActivityLog
@@ -13,9 +19,10 @@ from .serializers import (
     CategorySerializer, TeamSerializer, TeamMembershipSerializer,
     AchievementSerializer, UserAchievementSerializer, TeamChallengeSerializer,
     ActivityLogSerializer, LeaderboardSerializer, TeamLeaderboardSerializer,
-    GamificationStatsSerializer
+    PeriodLeaderboardSerializer
 )
-from .services import GamificationService, WebhookService
+from .services import DashboardService, GamificationService, WebhookService
+from .leaderboard import LeaderboardIndex, after_position, decode_cursor, encode_cursor, rollup_leaderboard
 from users.models import User
 
 
@@ -29,14 +36,34 @@ class TeamViewSet(viewsets.ModelViewSet):
     serializer_class = TeamSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_members_mode(self):
+        mode = self.request.query_params.get('members', 'full')
+        return mode if mode in TeamSerializer.MEMBER_MODES else 'full'
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['members'] = self.get_members_mode()
+        return context
+    
     def get_queryset(self):
         user = self.request.user
         if self.action == 'list':
             # Show teams user is member of or public teams
-            return Team.objects.filter(
-                Q(members=user) | Q(is_public=True)
-            ).distinct().select_related('category', 'administrator')
-        return Team.objects.all()
+            queryset = Team.objects.filter(
+                Q(is_public=True) | Q(pk__in=TeamMembership.objects.filter(user=user).values('team'))
+            )
+        else:
+            queryset = Team.objects.all()
+        
+        if self.action in ('list', 'retrieve'):
+            # Totals are stored on Team; members come from one prefetch query with their users joined
+            queryset = queryset.select_related('category', 'administrator')
+            if self.get_members_mode() != 'none':
+                queryset = queryset.prefetch_related(Prefetch(
+                    'teammembership_set',
+                    queryset=TeamMembership.objects.select_related('user').order_by('joined_at', 'id')
+                ))
+        return queryset
     
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
@@ -99,10 +126,7 @@ class TeamViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Access denied'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        members = User.objects.filter(teams=team).annotate(
-            achievements_count=Count('achievements'),
-            tasks_completed=Count('assigned_tasks', filter=Q(assigned_tasks__status='completed'))
-        ).order_by('-points')
+        members = User.objects.filter(teams=team).order_by('-points')
         
         leaderboard_data = []
         for rank, member in enumerate(members, 1):
@@ -124,7 +148,9 @@ class TeamViewSet(viewsets.ModelViewSet):
     def challenges(self, request, pk=None):
         """Get team challenges"""
         team = self.get_object()
-        challenges = team.challenges.all().order_by('-created_at')
+        challenges = team.challenges.annotate(
+            shard_progress=Sum('shards__amount')
+        ).order_by('-created_at')
         serializer = TeamChallengeSerializer(challenges, many=True)
         return Response(serializer.data)
 
@@ -161,20 +187,25 @@ class AchievementViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def progress(self, request):
         """Get achievement progress for all achievements"""
-        achievements = Achievement.objects.filter(is_active=True)
+        achievements = list(Achievement.objects.filter(is_active=True).select_related('category'))
+        earned_by_achievement = {
+            user_achievement.achievement_id: user_achievement
+            for user_achievement in UserAchievement.objects.filter(user=request.user)
+        }
+        metrics = GamificationService.achievement_metrics(
+            request.user, {achievement.type for achievement in achievements}
+        )
         progress_data = []
         
         for achievement in achievements:
-            user_achievement = UserAchievement.objects.filter(
-                user=request.user, achievement=achievement
-            ).first()
+            user_achievement = earned_by_achievement.get(achievement.id)
             
             if user_achievement:
                 progress = user_achievement.progress
                 earned = user_achievement.earned_at is not None
             else:
                 progress = GamificationService.calculate_achievement_progress(
-                    request.user, achievement
+                    request.user, achievement, metrics
                 )
                 earned = False
             
@@ -195,7 +226,7 @@ class TeamChallengeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Only show challenges for teams user is member of
         user_teams = self.request.user.teams.all()
-        return TeamChallenge.objects.filter(team__in=user_teams)
+        return TeamChallenge.objects.filter(team__in=user_teams).annotate(shard_progress=Sum('shards__amount'))
     
     def perform_create(self, serializer):
         team = serializer.validated_data['team']
@@ -215,54 +246,163 @@ class TeamChallengeViewSet(viewsets.ModelViewSet):
 
 class LeaderboardViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    MAX_PAGE_SIZE = 100
+    MAX_AROUND = 50
+    
+    def _int_param(self, request, name, default, maximum):
+        try:
+            value = int(request.query_params.get(name, default))
+        except ValueError:
+            value = default
+        return min(max(value, 1), maximum)
+    
+    def _next_url(self, request, items, *fields):
+        """Link to the page after `items`, keyed on the last row, or None on the last page"""
+        if not items:
+            return None
+        cursor = encode_cursor(*(items[-1][field] for field in fields))
+        return replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+    
+    @staticmethod
+    def _user_entry(user):
+        return {
+            'user_id': user.id,
+            'username': user.username,
+            'avatar': user.avatar,
+            'points': user.points,
+            'achievements_count': user.achievements_count,
+            'tasks_completed': user.tasks_completed,
+            'current_streak': user.current_streak,
+            'rank': user.rank
+        }
     
     @action(detail=False, methods=['get'])
     def global_leaderboard(self, request):
-        """Global user leaderboard"""
-        users = User.objects.annotate(
-            achievements_count=Count('achievements'),
-            tasks_completed=Count('assigned_tasks', filter=Q(assigned_tasks__status='completed'))
-        ).order_by('-points')[:50]  # Top 50
-        
-        leaderboard_data = []
-        for rank, user in enumerate(users, 1):
-            leaderboard_data.append({
-                'user_id': user.id,
-                'username': user.username,
-                'avatar': user.avatar,
-                'points': user.points,
-                'achievements_count': user.achievements_count,
-                'tasks_completed': user.tasks_completed,
-                'current_streak': user.current_streak,
-                'rank': rank
-            })
+        """Global user leaderboard, paginated with ?cursor= and ?limit="""
+        limit = self._int_param(request, 'limit', 50, self.MAX_PAGE_SIZE)
+        after = None
+        if request.query_params.get('cursor'):
+            try:
+                after = decode_cursor(request.query_params['cursor'], 2)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        users = LeaderboardIndex.shared().top(limit + 1, after=after)
+        leaderboard_data = [self._user_entry(user) for user in users[:limit]]
         
         serializer = LeaderboardSerializer(leaderboard_data, many=True)
+        return Response({
+            'next': self._next_url(request, leaderboard_data, 'points', 'user_id') if len(users) > limit else None,
+            'results': serializer.data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def around_me(self, request):
+        """The ?count= users directly above and below the requesting user"""
+        count = self._int_param(request, 'count', 5, self.MAX_AROUND)
+        users = LeaderboardIndex.shared().around(request.user, count)
+        
+        serializer = LeaderboardSerializer([self._user_entry(user) for user in users], many=True)
         return Response(serializer.data)
     
+    def _period_response(self, request, start, end):
+        """Leaderboard of points earned between two dates, optionally for one ?category= (id or name)"""
+        category = request.query_params.get('category')
+        category_id = None
+        if category:
+            lookup = {'id': category} if category.isdigit() else {'name': category}
+            category_id = Category.objects.filter(**lookup).values_list('id', flat=True).first()
+            if category_id is None:
+                return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        limit = self._int_param(request, 'limit', 50, self.MAX_PAGE_SIZE)
+        leaderboard_data = rollup_leaderboard(start, end, category_id=category_id, limit=limit)
+        
+        serializer = PeriodLeaderboardSerializer(leaderboard_data, many=True)
+        return Response({
+            'start': start,
+            'end': end,
+            'category': category_id,
+            'results': serializer.data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def weekly(self, request):
+        """Leaderboard for the current week (Monday to today)"""
+        today = timezone.localdate()
+        return self._period_response(request, today - timezone.timedelta(days=today.weekday()), today)
+    
+    @action(detail=False, methods=['get'])
+    def monthly(self, request):
+        """Leaderboard for the current calendar month"""
+        today = timezone.localdate()
+        return self._period_response(request, today.replace(day=1), today)
+    
+    @action(detail=False, methods=['get'], url_path='range')
+    def date_range(self, request):
+        """Leaderboard between ?start= and ?end= (YYYY-MM-DD, inclusive)"""
+        try:
+            start = parse_date(request.query_params.get('start', ''))
+            end = parse_date(request.query_params.get('end', '')) or timezone.localdate()
+        except ValueError:
+            start = None
+        if not start or start > end:
+            return Response({'error': 'start and end must be dates with start <= end'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return self._period_response(request, start, end)
+    
+    @action(detail=False, methods=['get'])
+    def rank(self, request):
+        """Rank of a user (?user_id=, defaults to the caller) or of a points value (?points=)"""
+        index = LeaderboardIndex.shared()
+        
+        if 'points' in request.query_params:
+            try:
+                points = int(request.query_params['points'])
+            except ValueError:
+                return Response({'error': 'points must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'points': points, 'rank': index.rank_for_points(points)})
+        
+        user = request.user
+        if 'user_id' in request.query_params:
+            user_id = request.query_params['user_id']
+            user = User.objects.filter(id=user_id).only('id', 'points').first() if user_id.isdigit() else None
+            if not user:
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'user_id': user.id, 'points': user.points, 'rank': index.rank_of(user)})
+    
     @action(detail=False, methods=['get'])
     def team_leaderboard(self, request):
-        """Team leaderboard"""
-        teams = Team.objects.filter(is_active=True).annotate(
-            total_points=Sum('members__points'),
-            member_count=Count('members'),
-            completed_challenges=Count('challenges', filter=Q(challenges__status='completed'))
-        ).order_by('-total_points')[:20]  # Top 20 teams
+        """Team leaderboard, paginated with ?cursor= and ?limit="""
+        limit = self._int_param(request, 'limit', 20, self.MAX_PAGE_SIZE)
+        teams = Team.objects.filter(is_active=True).order_by('-total_points', 'id')
+        
+        position = 0
+        if request.query_params.get('cursor'):
+            try:
+                total_points, team_id, position = decode_cursor(request.query_params['cursor'], 3)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            teams = teams.filter(after_position(total_points, team_id, field='total_points'))
+        teams = list(teams[:limit + 1])
         
         leaderboard_data = []
-        for rank, team in enumerate(teams, 1):
+        for rank, team in enumerate(teams[:limit], position + 1):
             leaderboard_data.append({
                 'team_id': team.id,
                 'team_name': team.name,
                 'avatar': team.avatar,
-                'total_points': team.total_points or 0,
+                'total_points': team.total_points,
                 'member_count': team.member_count,
                 'completed_challenges': team.completed_challenges,
                 'rank': rank
             })
         
         serializer = TeamLeaderboardSerializer(leaderboard_data, many=True)
-        return Response(serializer.data)
+        return Response({
+            'next': self._next_url(request, leaderboard_data, 'total_points', 'team_id', 'rank') if len(teams) > limit else None,
+            'results': serializer.data
+        })
 
 
 class DashboardViewSet(viewsets.ViewSet):
@@ -270,41 +410,46 @@ class DashboardViewSet(viewsets.ViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get comprehensive user statistics"""
-        user = request.user
-        
-        # Recent achievements (last 5)
-        recent_achievements = UserAchievement.objects.filter(
-            user=user
-        ).select_related('achievement').order_by('-earned_at')[:5]
-        
-        # Recent activities (last 10)
-        recent_activities = ActivityLog.objects.filter(
-            user=user
-        ).select_related('task', 'project', 'team', 'achievement').order_by('-timestamp')[:10]
+        """Get comprehensive user statistics
         
-        # User rank
-        user_rank = User.objects.filter(points__gt=user.points).count() + 1
+        Counters come from the already-loaded user, the rank from the in-memory
+        leaderboard and the rest from the user's DashboardSnapshot, so a request
+        costs one primary-key lookup. Unchanged dashboards answer 304 to If-None-Match.
+        """
+        user = request.user
+        snapshot = DashboardService.get_snapshot(user)
         
+        # The snapshot holds already-serialized data, so the response is assembled directly
         stats_data = {
             'total_points': user.points,
-            'achievements_earned': user.achievements.count(),
-            'tasks_completed': user.assigned_tasks.filter(status='completed').count(),
+            'achievements_earned': user.achievements_count,
+            'tasks_completed': user.tasks_completed,
             'current_streak': user.current_streak,
             'longest_streak': user.longest_streak,
-            'teams_joined': user.teams.count(),
-            'rank_position': user_rank,
-            'recent_achievements': UserAchievementSerializer(recent_achievements, many=True).data,
-            'recent_activities': ActivityLogSerializer(recent_activities, many=True).data
+            'teams_joined': snapshot.data['teams_joined'],
+            'rank_position': LeaderboardIndex.shared().rank_of(user),
+            'recent_achievements': snapshot.data['recent_achievements'],
+            'recent_activities': snapshot.data['recent_activities']
         }
+        etag = '"%s"' % hashlib.md5(json.dumps(stats_data, sort_keys=True).encode()).hexdigest()
         
-        serializer = GamificationStatsSerializer(stats_data)
-        return Response(serializer.data)
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(stats_data, headers={'ETag': etag})
+
+
+class ActivityCursorPagination(CursorPagination):
+    """Keyset pagination on timestamp, served by the (user, timestamp) indexes at any depth"""
+    ordering = '-timestamp'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
 
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ActivityCursorPagination
     
     def get_queryset(self):
         queryset = ActivityLog.objects.filter(user=self.request.user)
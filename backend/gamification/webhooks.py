@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookSender:
+    """Shared HTTP client with a keep-alive session and concurrency limit per webhook host"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers=None, per_host_concurrency=None, timeout=10):
+        self.max_workers = max_workers or settings.WEBHOOK_MAX_WORKERS
+        self.per_host_concurrency = per_host_concurrency or settings.WEBHOOK_PER_HOST_CONCURRENCY
+        self.timeout = timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='webhook-sender'
+        )
+
+    @classmethod
+    def shared(cls):
+        """Process-wide sender so connections are reused across notifications"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _host(self, webhook_url):
+        host = urlsplit(webhook_url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_concurrency)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._hosts[host] = (session, threading.BoundedSemaphore(self.per_host_concurrency))
+            return self._hosts[host]
+
+    def post(self, webhook_url, payload):
+        session, limit = self._host(webhook_url)
+        with limit:
+            return session.post(webhook_url, json=payload, timeout=self.timeout)
+
+    def map(self, func, items):
+        """Run func over items on the sender's thread pool, preserving order"""
+        return list(self._executor.map(func, items))
+
+
+class TokenBucket:
+    """Classic token bucket; tokens refill continuously at `rate` per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait):
+        """Take a token, returning how long to wait for it, or None if that exceeds max_wait"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+
+class CircuitBreaker:
+    """Stops calling an endpoint after repeated failures, then lets one probe through"""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def retry_after(self):
+        """Seconds until a request may be attempted, or 0 if the circuit allows it now"""
+        if self.opened_at is None:
+            return 0
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0 or self.probing:
+            return max(remaining, 1.0)
+        self.probing = True  # Half-open: allow a single trial request
+        return 0
+
+    def release_probe(self):
+        """Let another probe through when the current one ended without a real attempt"""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+@dataclass
+class DeliveryResult:
+    ok: bool
+    retryable: bool = False
+    attempted: bool = True  # False when throttled or held back by an open circuit; not counted as an attempt
+    retry_after: Optional[float] = None
+    status_code: Optional[int] = None
+    error: str = ''
+
+
+class WebhookDispatcher:
+    """Delivers webhook payloads while respecting per-URL rate limits and endpoint health"""
+
+    MAX_THROTTLE_WAIT = 2.0  # Longer waits are deferred back to the outbox
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 60
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, sender=None, rate=None, burst=None):
+        self.sender = sender or WebhookSender.shared()
+        self.rate = rate or settings.WEBHOOK_RATE_PER_SECOND
+        self.burst = burst or settings.WEBHOOK_RATE_BURST
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _endpoint(self, webhook_url):
+        if webhook_url not in self._endpoints:
+            self._endpoints[webhook_url] = {
+                'bucket': TokenBucket(self.rate, self.burst),
+                'circuit': CircuitBreaker(self.FAILURE_THRESHOLD, self.RESET_TIMEOUT),
+                'blocked_until': 0.0,
+            }
+        return self._endpoints[webhook_url]
+
+    def _acquire(self, webhook_url):
+        """Return the seconds to sleep before sending, or a DeliveryResult deferring the send"""
+        with self._lock:
+            endpoint = self._endpoint(webhook_url)
+
+            circuit = endpoint['circuit']
+            retry_after = circuit.retry_after()
+            if retry_after:
+                return DeliveryResult(ok=False, attempted=False, retry_after=retry_after,
+                                      error='Circuit open')
+
+            blocked = endpoint['blocked_until'] - time.monotonic()
+            if blocked > self.MAX_THROTTLE_WAIT:
+                circuit.release_probe()
+                return DeliveryResult(ok=False, attempted=False, retry_after=blocked,
+                                      error='Rate limited')
+
+            wait = endpoint['bucket'].reserve(self.MAX_THROTTLE_WAIT - max(blocked, 0))
+            if wait is None:
+                circuit.release_probe()
+                return DeliveryResult(ok=False, attempted=False, retry_after=1 / self.rate,
+                                      error='Rate limited')
+            return max(blocked, 0) + wait
+
+    @staticmethod
+    def _rate_limit_delay(response):
+        """Seconds the endpoint asked us to back off, from Retry-After or X-RateLimit-* headers"""
+        headers = response.headers
+        if response.status_code == 429:
+            for value in (headers.get('Retry-After'), headers.get('X-RateLimit-Reset-After')):
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    pass
+            try:
+                return float(response.json().get('retry_after'))
+            except (ValueError, TypeError, AttributeError):
+                return 1.0
+        if headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                return float(headers.get('X-RateLimit-Reset-After'))
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def dispatch(self, webhook_url, payload):
+        acquired = self._acquire(webhook_url)
+        if isinstance(acquired, DeliveryResult):
+            return acquired
+        if acquired:
+            time.sleep(acquired)
+
+        try:
+            response = self.sender.post(webhook_url, payload)
+        except requests.RequestException as e:
+            logger.warning("Webhook request to %s failed: %s", urlsplit(webhook_url).netloc, e)
+            with self._lock:
+                self._endpoint(webhook_url)['circuit'].record_failure()
+            return DeliveryResult(ok=False, retryable=True, error=str(e))
+
+        delay = self._rate_limit_delay(response)
+        with self._lock:
+            endpoint = self._endpoint(webhook_url)
+            if delay:
+                endpoint['blocked_until'] = max(endpoint['blocked_until'], time.monotonic() + delay)
+
+            if 200 <= response.status_code < 300:
+                endpoint['circuit'].record_success()
+                return DeliveryResult(ok=True, status_code=response.status_code)
+            if response.status_code == 429:
+                # Throttling is not an endpoint failure; retry once the window resets
+                endpoint['circuit'].release_probe()
+                return DeliveryResult(ok=False, attempted=False, retry_after=delay,
+                                      status_code=429, error='Rate limited (429)')
+
+            endpoint['circuit'].record_failure()
+
+        retryable = response.status_code >= 500 or response.status_code == 408
+        return DeliveryResult(ok=False, retryable=retryable, status_code=response.status_code,
+                              error=f"HTTP {response.status_code}: {response.text[:200]}")
@@ -1,9 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
+from users.tracking import TrackedFieldsMixin
 
 
-class Project(models.Model):
+class Project(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     start_date = models.DateTimeField(auto_now_add=True)
@@ -25,6 +26,9 @@ class Project(models.Model):
                                               related_name='project_members',
                                               blank=True)
     
+    # Used to detect a project being closed
+    TRACKED_FIELDS = ('is_active',)
+    
     def __str__(self):
         return self.name
     
@@ -43,7 +47,7 @@ class Project(models.Model):
         ordering = ['-start_date']
 
 
-class Task(models.Model):
+class Task(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('todo', 'To Do'),
         ('in_progress', 'In Progress'),
@@ -74,18 +78,32 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Used to detect status transitions and keep completion counters and rollups on the right user and day
+    TRACKED_FIELDS = ('status', 'assigned_to_id', 'created_by_id', 'completed_at')
+    # Concurrent completions of the same task must not both count as the transition
+    LOCK_TRACKED_FIELDS = True
+
     def __str__(self):
         return self.name
     
+    def became_completed(self):
+        """Whether the current save moves an existing, unfinished task to completed"""
+        return self.status == 'completed' and self.loaded_value('status', 'completed') != 'completed'
+    
     def complete_task(self):
-        if self.assigned_to and self.status != 'completed':
+        if not self.assigned_to or self.status == 'completed':
+            return False
+        with transaction.atomic():
+            # Whoever locks the row first completes it; a concurrent call then sees it done
+            status = Task.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
+            if status == 'completed':
+                return False
             self.status = 'completed'
             self.completed_at = timezone.now()
             self.assigned_to.exp_points += self.experience_reward
-            self.assigned_to.save()
+            self.assigned_to.save(update_fields=['exp_points'])
             self.save()
-            return True
-        return False
+        return True
     
     class Meta:
         ordering = ['-created_at']
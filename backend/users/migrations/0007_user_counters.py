@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:13
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def populate_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Task = apps.get_model('projects', 'Task')
+    Project = apps.get_model('projects', 'Project')
+    UserAchievement = apps.get_model('gamification', 'UserAchievement')
+
+    completed = Task.objects.filter(status='completed')
+    User.objects.update(
+        tasks_completed=count_subquery(completed, 'assigned_to'),
+        collaboration_completed=count_subquery(completed.exclude(created_by=F('assigned_to')), 'assigned_to'),
+        projects_created=count_subquery(Project.objects.all(), 'owner'),
+        achievements_count=count_subquery(UserAchievement.objects.all(), 'user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_exp_points'),
+        ('projects', '0003_alter_project_options_project_category_project_team'),
+        ('gamification', '0005_webhookdeadletter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='achievements_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='collaboration_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='projects_created',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tasks_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0007_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('current_streak__gt', 0)), fields=['last_activity_date'], name='user_live_streak_idx'),
+        ),
+    ]
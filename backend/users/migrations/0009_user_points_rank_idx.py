@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0008_user_live_streak_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-points', 'id'], name='user_points_rank_idx'),
+        ),
+    ]
@@ -1,15 +1,23 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from .tracking import TrackedFieldsMixin
 
 
-class User(AbstractUser):
+class User(TrackedFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True)
     
     points = models.IntegerField(default=0)
     current_streak = models.IntegerField(default=0)
     longest_streak = models.IntegerField(default=0)
     last_activity_date = models.DateField(null=True, blank=True)
+    exp_points = models.IntegerField(default=0)
+    
+    # Denormalized counters, maintained with F() updates by gamification signals
+    tasks_completed = models.IntegerField(default=0)
+    collaboration_completed = models.IntegerField(default=0)  # Completed tasks created by someone else
+    projects_created = models.IntegerField(default=0)
+    achievements_count = models.IntegerField(default=0)
     
     avatar = models.CharField(max_length=10, default='👤')
     bio = models.TextField(blank=True, max_length=500)
@@ -18,17 +26,33 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
+    # Lets post_save receivers skip saves that leave the streak alone
+    TRACKED_FIELDS = ('current_streak',)
+    
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Lets the nightly streak rollover find only users with a live streak
+            models.Index(
+                fields=['last_activity_date'],
+                condition=models.Q(current_streak__gt=0),
+                name='user_live_streak_idx'
+            ),
+            # Serves the top of the leaderboard without sorting every user
+            models.Index(fields=['-points', 'id'], name='user_points_rank_idx'),
+        ]
+    
     def __str__(self):
         return self.username
     
     def get_rank(self):
         """Get user's rank based on points"""
-        return User.objects.filter(points__gt=self.points).count() + 1
+        from gamification.leaderboard import LeaderboardIndex
+        return LeaderboardIndex.shared().rank_of(self)
     
     def get_total_achievements(self):
         """Get total number of achievements earned"""
-        return self.achievements.count()
+        return self.achievements_count
     
     def get_completed_tasks(self):
         """Get total number of completed tasks"""
-        return self.assigned_tasks.filter(status='completed').count()
+        return self.tasks_completed
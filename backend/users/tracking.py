@@ -0,0 +1,73 @@
+from django.db import transaction
+
+
+class TrackedFieldsMixin:
+    """Remembers TRACKED_FIELDS as last loaded from or saved to the database
+    
+    post_save receivers compare them with the current values to tell what a
+    save actually changed. New instances and deferred fields have no loaded
+    value.
+    
+    With LOCK_TRACKED_FIELDS, saves of existing rows re-read the tracked
+    fields under a row lock first, so of two concurrent saves making the
+    same change only the first sees it as a change.
+    """
+    
+    TRACKED_FIELDS = ()
+    LOCK_TRACKED_FIELDS = False
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            field: getattr(instance, field) for field in cls.TRACKED_FIELDS if field in field_names
+        }
+        return instance
+    
+    def _tracked(self, fields=None):
+        """The tracked fields among `fields` (default: all fields)"""
+        if fields is None:
+            return list(self.TRACKED_FIELDS)
+        written = {self._meta.get_field(name).attname for name in fields}
+        return [field for field in self.TRACKED_FIELDS if field in written]
+    
+    def _remember(self, fields=None):
+        tracked = self._tracked(fields)
+        self._loaded_values = {
+            **getattr(self, '_loaded_values', {}),
+            **{field: getattr(self, field) for field in tracked}
+        }
+    
+    def _lock(self, fields=None):
+        tracked = self._tracked(fields)
+        if not tracked:
+            return
+        current = type(self)._base_manager.select_for_update().filter(pk=self.pk).values(*tracked).first()
+        if current is not None:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **current}
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self.LOCK_TRACKED_FIELDS or self._state.adding or self.pk is None:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get('using')):
+                self._lock(update_fields)
+                super().save(*args, **kwargs)
+        self._remember(update_fields)
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._remember(fields)
+    
+    def loaded_value(self, field, default=None):
+        """Value of a tracked field before the current save, or `default` if it was never loaded"""
+        return getattr(self, '_loaded_values', {}).get(field, default)
+    
+    def changed_fields(self):
+        """{field: (loaded value, current value)} for loaded tracked fields that differ"""
+        return {
+            field: (loaded, getattr(self, field))
+            for field, loaded in getattr(self, '_loaded_values', {}).items()
+            if loaded != getattr(self, field)
+        }